@@ -1,12 +1,13 @@
 
 import os
 import shutil
+import tarfile
 import time
 
 from google.cloud import storage
 from webcorpus.processors.arts import ArtsProcessor
 from webcorpus.processors.sent import SentProcessor
-from webcorpus.corpus import SentCorpus
+from webcorpus.corpus import FileCorpus
 from firebase_admin import credentials, firestore, initialize_app
 
 
@@ -36,6 +37,20 @@ class GCP:
         blob.upload_from_filename(filename=filename)
 
 
+def make_archive(base_name, root_dir):
+    """
+    Like shutil.make_archive(base_name, 'xztar', root_dir), but leaves out
+    the dotfiles, i.e. the url index and the manifests of the processors
+    """
+    def skip_dotfiles(info):
+        name = os.path.basename(info.name)
+        return None if name.startswith('.') and name != '.' else info
+
+    with tarfile.open(base_name + '.tar.xz', 'w:xz') as tar:
+        tar.add(root_dir, arcname='.', filter=skip_dotfiles)
+    return base_name + '.tar.xz'
+
+
 gcp = GCP()
 fsclient = Firestore()
 
@@ -86,15 +101,17 @@ def run_jobs(job_list):
                                   '/tmp', 'xztar')
             proc = ArtsProcessor(job[0], '/tmp/{}'.format(job[1]),
                                  '/tmp/{}_arts/{}'.format(job[1], job[1]))
-            proc.gen_dataset()
+            proc.run()
             shutil.rmtree('/tmp/{}'.format(job[1]))
             os.remove('/tmp/{}_html.tar.xz'.format(job[1]))
-            shutil.make_archive('/tmp/{}_arts'.format(job[1]), 'xztar',
-                                '/tmp/{}_arts/{}'.format(job[1], job[1]))
+            make_archive('/tmp/{}_arts'.format(job[1]),
+                         '/tmp/{}_arts/{}'.format(job[1], job[1]))
             gcp.push(get_blob_path(job[0], 'arts', job[1]),
                      '/tmp/{}_arts.tar.xz'.format(job[1]))
 
-            num_arts = len(os.listdir('/tmp/{0}_arts/{0}'.format(job[1])))
+            num_arts = len([fname for fname in
+                            os.listdir('/tmp/{0}_arts/{0}'.format(job[1]))
+                            if not fname.startswith('.')])
             doc_ref.update({'arts.{}'.format(job[1]): num_arts})
         else:
             gcp.pull(get_blob_path(job[0], 'arts', job[1]),
@@ -107,13 +124,13 @@ def run_jobs(job_list):
             os.remove('/tmp/{}_sent'.format(job[1]))
         proc = SentProcessor(job[0], '/tmp/{}_arts'.format(job[1]),
                              '/tmp/{}_sent'.format(job[1]))
-        proc.gen_dataset()
+        proc.run()
         shutil.make_archive('/tmp/{}_sent'.format(job[1]), 'xztar', '/tmp',
                             '{}_sent'.format(job[1]))
         gcp.push(get_blob_path(job[0], 'sent', job[1]),
                  '/tmp/{}_sent.tar.xz'.format(job[1]))
 
-        corpus = SentCorpus(job[0], '/tmp/{}_sent'.format(job[1]))
+        corpus = FileCorpus(job[0], '/tmp/{}_sent'.format(job[1]))
         doc_ref.update({'sent.{}'.format(job[1]): corpus.get_stats()['tokens']})
         os.remove('/tmp/{}_sent'.format(job[1]))
         os.remove('/tmp/{}_sent.tar.xz'.format(job[1]))
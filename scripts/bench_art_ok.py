@@ -0,0 +1,68 @@
+"""
+Benchmarks the article quality check against the original list-based version
+
+./bench_art_ok.py --lang <iso code> --input <article corpus path> [--count 10000]
+
+Both versions are run on the same articles; the script fails if they ever
+disagree on an accept/reject decision.
+"""
+
+import argparse
+import time
+
+from itertools import islice
+
+from webcorpus.corpus import NewsCorpus
+from webcorpus.language import code2script, in_script
+from webcorpus.language.quality import art_ok
+
+
+def legacy_art_ok(text, script, win_sz=250, thres=200, min_ratio=None):
+    txt_sz = len(text)
+    if txt_sz < win_sz:
+        return False
+
+    chr_valid = [in_script(c, script) for c in text]
+
+    if min_ratio is not None and sum(chr_valid) < min_ratio*txt_sz:
+        return False
+
+    subarr_sum = chr_valid.copy()
+    for cur_sz in range(2, win_sz):
+        subarr_sum = [
+            chr_valid[i] + subarr_sum[i + 1] for i in range(txt_sz - cur_sz)
+        ]
+    if max(subarr_sum) >= thres:
+        return True
+
+    return False
+
+
+def timed(fn, texts, script, min_ratio):
+    start = time.perf_counter()
+    decisions = [fn(text, script, min_ratio=min_ratio) for text in texts]
+    return decisions, time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--lang", type=str)
+parser.add_argument("--input", type=str)
+parser.add_argument("--count", type=int, default=10000)
+parser.add_argument("--min-ratio", type=float, default=None)
+
+args = parser.parse_args()
+
+script = code2script(args.lang)
+corpus = NewsCorpus(args.lang, args.input)
+texts = [art['body'] for art in islice(corpus.all_instances(), args.count)]
+print('Loaded {} articles'.format(len(texts)))
+
+old, old_time = timed(legacy_art_ok, texts, script, args.min_ratio)
+new, new_time = timed(art_ok, texts, script, args.min_ratio)
+
+mismatches = sum(a != b for a, b in zip(old, new))
+print('legacy: {:.2f}s, vectorized: {:.2f}s, speedup: {:.1f}x'
+      .format(old_time, new_time, old_time / max(new_time, 1e-9)))
+print('accepted: {}/{}, mismatches: {}'.format(sum(new), len(new), mismatches))
+if mismatches:
+    raise SystemExit(1)
@@ -0,0 +1,76 @@
+"""
+Checks that the compiled normalizers give the same output as the original
+normalizer classes, and compares their speed
+
+./check_normalizer.py [--count 20000] [--input <sentence file>]
+
+Every language is tried with every combination of the normalizer options,
+on random strings made of the characters the normalizers deal with, and on
+the lines of the input file if one is given. The script fails on the first
+mismatch.
+"""
+
+import argparse
+import random
+import time
+
+from itertools import islice
+from webcorpus.language import langinfo
+from webcorpus.language.normalize import IndicNormalizerFactory
+
+
+LANGS = ['hi', 'mr', 'pa', 'gu', 'bn', 'as', 'or', 'ml', 'kn', 'ta', 'te',
+         'en']
+NASALS_MODES = ['do_nothing', 'to_anusvaara_strict', 'to_anusvaara_relaxed',
+                'to_nasal_consonants']
+SPECIALS = ('\ufeff\ufffe\u2060\u00ad\u200b\u00a0\u200c\u200d'
+            '|: ab12\u0964')
+
+
+def random_texts(lang, count, rng):
+    start = langinfo.SCRIPT_RANGES.get(lang, [0x900])[0]
+    block = [chr(c) for c in range(start, start + 0x80)]
+    alphabet = block * 3 + list(SPECIALS)
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+            for _ in range(count)]
+
+
+def timed(normalizer, texts):
+    start = time.perf_counter()
+    outputs = [normalizer.normalize(text) for text in texts]
+    return outputs, time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--count", type=int, default=20000)
+parser.add_argument("--input", type=str, default=None)
+args = parser.parse_args()
+
+rng = random.Random(0)
+factory = IndicNormalizerFactory()
+lines = []
+if args.input:
+    with open(args.input, encoding='utf-8') as fp:
+        lines = [line.rstrip('\n') for line in islice(fp, args.count)]
+
+for lang in LANGS:
+    texts = random_texts(lang, args.count, rng) + lines
+    for remove_nuktas in [False, True]:
+        # the nasal modes only work for the scripts in langinfo
+        modes = NASALS_MODES if lang in langinfo.SCRIPT_RANGES else \
+            NASALS_MODES[:1]
+        for nasals_mode in modes:
+            orig = factory.get_normalizer(lang, remove_nuktas, nasals_mode)
+            comp = factory.get_normalizer(lang, remove_nuktas, nasals_mode,
+                                          compiled=True)
+            expected, orig_time = timed(orig, texts)
+            got, comp_time = timed(comp, texts)
+            for text, a, b in zip(texts, expected, got):
+                if a != b:
+                    print('Mismatch for {} {} {}: {!r} -> {!r} != {!r}'.format(
+                        lang, remove_nuktas, nasals_mode, text, a, b))
+                    raise SystemExit(1)
+            print('{} nuktas={} {}: {} texts, original {:.2f}s, compiled '
+                  '{:.2f}s'.format(lang, remove_nuktas, nasals_mode,
+                                   len(texts), orig_time, comp_time))
+print('All outputs identical')
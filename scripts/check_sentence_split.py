@@ -0,0 +1,137 @@
+"""
+Checks that sentence_split gives the same output as the original two-phase
+splitter, which transliterated every candidate abbreviation to Devanagari,
+and compares their speed
+
+./check_sentence_split.py [--count 20000] [--input <articles file>]
+
+Every language is tried on random paragraphs made of words of its script,
+acronyms and abbreviations (written in its script, in Devanagari and mixed),
+numbers and sentence delimiters, and on the lines of the input file if one
+is given. The script fails on the first mismatch.
+"""
+
+import argparse
+import random
+import time
+
+from itertools import islice
+from webcorpus.language import langinfo
+from webcorpus.language.sentence_tokenize import (
+    ACRONYMS_ABBVRS, DELIM_PAT, sentence_split)
+from webcorpus.language.unicode_transliterate import \
+    UnicodeIndicTransliterator
+
+
+LANGS = ['hi', 'mr', 'pa', 'gu', 'bn', 'as', 'or', 'ml', 'kn', 'ta', 'te',
+         'si', 'en']
+PIECES = ['.', '. ', ' . ', '?', '! ', '। ', '॥', ' ', '  ', '12',
+          '3.5', 'A.', 'Dr. ']
+
+
+def legacy_sentence_split(text, lang, delim_pat=DELIM_PAT):
+
+    def is_acronym_abbvr(text, lang):
+        return UnicodeIndicTransliterator.transliterate(text, lang, "hi") \
+            in ACRONYMS_ABBVRS
+
+    cand_sentences = []
+    begin = 0
+    text = text.strip()
+    for mo in delim_pat.finditer(text):
+        p1 = mo.start()
+        if p1 > 0 and text[p1 - 1].isnumeric():
+            continue
+        end = p1 + 1
+        s = text[begin:end].strip()
+        if len(s) > 0:
+            cand_sentences.append(s)
+        begin = p1 + 1
+    s = text[begin:].strip()
+    if len(s) > 0:
+        cand_sentences.append(s)
+
+    final_sentences = []
+    sen_buffer = ""
+    bad_state = False
+    for sentence in cand_sentences:
+        words = sentence.split(" ")
+        if len(words) == 1 and sentence[-1] == ".":
+            bad_state = True
+            sen_buffer = sen_buffer + " " + sentence
+        elif sentence[-1] == "." and is_acronym_abbvr(words[-1][:-1], lang):
+            if len(sen_buffer) > 0 and not bad_state:
+                final_sentences.append(sen_buffer)
+            bad_state = True
+            sen_buffer = sentence
+        elif bad_state:
+            sen_buffer = sen_buffer + " " + sentence
+            if len(sen_buffer) > 0:
+                final_sentences.append(sen_buffer)
+            sen_buffer = ""
+            bad_state = False
+        else:
+            if len(sen_buffer) > 0:
+                final_sentences.append(sen_buffer)
+            sen_buffer = sentence
+            bad_state = False
+    if len(sen_buffer) > 0:
+        final_sentences.append(sen_buffer)
+    return final_sentences
+
+
+def vocabulary(lang, rng):
+    start = langinfo.SCRIPT_RANGES.get(lang, [0x900])[0]
+    block = [chr(c) for c in range(start, start + 0x80)]
+    words = [''.join(rng.choice(block) for _ in range(rng.randint(1, 6)))
+             for _ in range(200)]
+    acronyms = sorted(ACRONYMS_ABBVRS)
+    native = [UnicodeIndicTransliterator.transliterate(w, 'hi', lang)
+              for w in acronyms]
+    # half in the script of the language, half in Devanagari
+    mixed = [n[:len(n) // 2] + a[len(a) // 2:]
+             for n, a in zip(native, acronyms)]
+    return words + native * 2 + acronyms + mixed
+
+
+def random_texts(lang, count, rng):
+    vocab = vocabulary(lang, rng)
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(0, 30)):
+            parts.append(rng.choice(vocab))
+            parts.append(rng.choice(PIECES))
+        texts.append(''.join(parts))
+    return texts
+
+
+def timed(split, texts, lang):
+    start = time.perf_counter()
+    outputs = [split(text, lang) for text in texts]
+    return outputs, time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--count", type=int, default=20000)
+parser.add_argument("--input", type=str, default=None)
+args = parser.parse_args()
+
+rng = random.Random(0)
+lines = []
+if args.input:
+    with open(args.input, encoding='utf-8') as fp:
+        lines = [line.rstrip('\n') for line in islice(fp, args.count)]
+
+for lang in LANGS:
+    texts = random_texts(lang, args.count, rng) + lines
+    expected, legacy_time = timed(legacy_sentence_split, texts, lang)
+    got, new_time = timed(sentence_split, texts, lang)
+    for text, a, b in zip(texts, expected, got):
+        if a != b:
+            print('Mismatch for {}: {!r} -> {!r} != {!r}'.format(
+                lang, text, a, b))
+            raise SystemExit(1)
+    print('{}: {} texts, legacy {:.2f}s, new {:.2f}s'.format(
+        lang, len(texts), legacy_time, new_time))
+print('All outputs identical')
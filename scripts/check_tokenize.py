@@ -0,0 +1,78 @@
+"""
+Checks that the single scan Indic tokenizer gives the same tokens as the
+original three pass tokenizer, and compares their speed
+
+./check_tokenize.py [--count 100000] [--input <sentence file>]
+
+The tokenizers are run on random strings of words, numbers, punctuation,
+spaces and tabs, and on the lines of the input file if one is given. The
+script fails on the first mismatch.
+"""
+
+import argparse
+import random
+import re
+import time
+
+from itertools import islice
+from webcorpus.language.tokenize import (
+    pat_num_seq, triv_tokenizer_indic_pat, tokenize, trivial_tokenize_indic)
+
+
+PIECES = ['भारत', 'की', 'ab', '12', '3', '०९', ' ', ' ', ' ', '  ', '\t',
+          '.', ',', ':', '/', '-', '(', ')', '।', '॥', '"', '\\', ']', '\n',
+          '\xa0']
+
+
+def legacy_tokenize_indic(s):
+    tok_str = triv_tokenizer_indic_pat.sub(r" \1 ", s.replace("\t", " "))
+    s = re.sub(r"[ ]+", " ", tok_str).strip(" ")
+    new_s = ""
+    prev = 0
+    for m in pat_num_seq.finditer(s):
+        start = m.start()
+        end = m.end()
+        if start > prev:
+            new_s = new_s + s[prev:start]
+            new_s = new_s + s[start:end].replace(" ", "")
+            prev = end
+    new_s = new_s + s[prev:]
+    return new_s.split(" ")
+
+
+def random_texts(count, rng):
+    return [''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 40)))
+            for _ in range(count)]
+
+
+def timed(func, texts):
+    start = time.perf_counter()
+    outputs = [func(text) for text in texts]
+    return outputs, time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--count", type=int, default=100000)
+parser.add_argument("--input", type=str, default=None)
+args = parser.parse_args()
+
+rng = random.Random(0)
+texts = random_texts(args.count, rng)
+if args.input:
+    with open(args.input, encoding='utf-8') as fp:
+        texts += [line.rstrip('\n') for line in islice(fp, args.count)]
+
+expected, legacy_time = timed(legacy_tokenize_indic, texts)
+got, new_time = timed(trivial_tokenize_indic, texts)
+for text, a, b in zip(texts, expected, got):
+    if a != b:
+        print('Mismatch: {!r} -> {!r} != {!r}'.format(text, a, b))
+        raise SystemExit(1)
+for text, tokens in zip(texts, expected):
+    if tokenize(text) != ' '.join(tokens):
+        print('Mismatch of the joined tokens: {!r}'.format(text))
+        raise SystemExit(1)
+_, joined_time = timed(tokenize, texts)
+print('{} texts: legacy {:.2f}s, new {:.2f}s ({:.2f}s joined)'.format(
+    len(texts), legacy_time, new_time, joined_time))
+print('All outputs identical')
@@ -1,4 +1,5 @@
 
+import glob
 import os
 import shutil
 import time
@@ -9,7 +10,8 @@ import subprocess
 from google.cloud import storage
 from webcorpus.processors.arts import ArtsProcessor
 from webcorpus.processors.sent import SentProcessor
-from webcorpus.corpus.io import SentCorpus
+from webcorpus.processors.dedup import DedupProcessor
+from webcorpus.corpus import FileCorpus
 from firebase_admin import credentials, firestore, initialize_app
 
 
@@ -56,10 +58,11 @@ def get_blob_path(lang, dtype, source):
 
 
 def dump_stats(lang, fname):
-    subprocess.call('echo ' + lang + '  ' + fname + ' >> ../stats', shell=True)
-    subprocess.call('wc -l < ' + fname + '  >> ../stats', shell=True)
-    subprocess.call('cat ' + fname + ' | tr " " "\\n" | wc -l  >> ../stats', shell=True)
-    subprocess.call('cat ' + fname + ' | tr " " "\\n" | runiq - | wc -l  >> ../stats', shell=True)
+    stats = FileCorpus(lang, fname).get_stats(exact=True)
+    with open('../stats', 'a') as fp:
+        fp.write('{}  {}\n'.format(lang, fname))
+        fp.write('{}\n{}\n{}\n'.format(stats['lines'], stats['tokens'],
+                                      stats['unique_tokens']))
 
 
 def process_lang(lang):
@@ -83,8 +86,9 @@ def process_lang(lang):
     # subprocess.call('gunzip oscar.txt.gz', shell=True)
 
     # generate f1, f2, f3, f4
+    sent_files = sorted(glob.glob('*_sent'))
     subprocess.call('cat *_sent > wc', shell=True)
-    subprocess.call('runiq wc > wc_dedup', shell=True)
+    DedupProcessor(lang, sent_files, 'wc_dedup').run()
     # subprocess.call('cat wc oscar.txt > wc_cc', shell=True)
     # subprocess.call('runiq wc_cc > wc_cc_dedup', shell=True)
 
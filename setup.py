@@ -81,7 +81,7 @@ setup(
     # https://packaging.python.org/en/latest/requirements.html
     install_requires=['morfessor', 'boilerpipe3', 'tldextract', 'click',
                       'scrapy', 'tqdm', 'pandas', 'scrapyd', 'nltk',
-                      'scrapyd-client', 'htmldate'],
+                      'scrapyd-client', 'htmldate', 'numpy', 'zstandard'],
 
     # If there are data files included in your packages that need to be
     # installed, specify them here.
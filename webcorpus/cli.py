@@ -1,19 +1,24 @@
 #!/usr/bin/env python3
 
 import click
+import glob
 import logging
 import requests
 import time
 import os
 import subprocess
+from datetime import datetime
 
 from termcolor import cprint
 from scrapyd.scripts.scrapyd_run import main as scrapyd_main
 
 from webcorpus.crawlers.w3newspaper import W3NewsPaperSpider
 from webcorpus.crawlers.news import RecursiveSpider
+from webcorpus.sources import Sources
 from webcorpus.processors.arts import ArtsProcessor
 from webcorpus.processors.sent import SentProcessor
+from webcorpus.processors.dedup import DedupProcessor
+from webcorpus.processors.neardup import NearDupProcessor
 
 
 def scrapyd_query(url, **kwargs):
@@ -50,21 +55,58 @@ def start(port):
 @cli.command(name='crawl')
 @click.option('--path', required=True)
 @click.option('--name', required=True)
-@click.option('--url', required=True)
+@click.option('--url', required=False)
 @click.option('--log', required=True)
-def crawl(path, name, url, log):
+@click.option('--lang', default='en')
+@click.option('--sources', default=None,
+              help='sources file to look the source up in')
+@click.option('--since', default=None,
+              help='YYYY-MM-DD; sitemap crawls skip pages modified before')
+@click.option('--backend', type=click.Choice(['dir', 'shard']), default='dir')
+@click.option('--recrawl', is_flag=True, default=False,
+              help='fetch stored pages again when due, and store them '
+                   'if they have changed')
+def crawl(path, name, url, log, lang, sources, since, backend, recrawl):
+    if since:
+        try:
+            datetime.strptime(since, '%Y-%m-%d')
+        except ValueError:
+            cprint('--since should be a date, YYYY-MM-DD', 'red',
+                   attrs=['bold'])
+            return
+    source = {'name': name, 'home_url': url, 'sitemap_url': '',
+              'use_sitemap': False}
+    if sources:
+        known = Sources(lang, sources).all()
+        if name not in known:
+            cprint('{} is not in {}'.format(name, sources), 'red',
+                   attrs=['bold'])
+            return
+        source.update(known[name])
+        source['home_url'] = url or source['home_url']
+    if not source['home_url']:
+        cprint('No url given for {}'.format(name), 'red', attrs=['bold'])
+        return
     try:
         data = {
             'project': 'webcorpus',
             'spider': 'recursive-spider',
             'html_path': path,
             'source_name': name,
-            'home_url': url,
-            'lang': 'en',
-            'log_path': log
+            'home_url': source['home_url'],
+            'lang': lang,
+            'log_path': log,
+            'corpus_backend': backend,
+            'recrawl': int(recrawl)
         }
+        if source['use_sitemap'] and source['sitemap_url']:
+            data['spider'] = 'sitemap-spider'
+            data['sitemap_url'] = source['sitemap_url']
+            if since:
+                data['since'] = since
         status = requests.post('http://localhost/schedule.json', data=data)
-        cprint('Crawl started', 'green', attrs=['bold'])
+        cprint('Crawl started ({})'.format(data['spider']), 'green',
+               attrs=['bold'])
     except Exception as e:
         print(e)
         cprint('Failed to start the crawl', 'red', attrs=['bold'])
@@ -75,11 +117,27 @@ def crawl(path, name, url, log):
 @click.option('--lang', required=True)
 @click.option('--input', required=True)
 @click.option('--output', required=True)
-def process(operation, lang, input, output):
+@click.option('--backend', type=click.Choice(['dir', 'shard']), default=None)
+@click.option('--workers', type=int, default=None)
+@click.option('--chunk-size', type=int, default=64)
+@click.option('--extractor', type=click.Choice(['boilerpipe', 'lxml']),
+              default='boilerpipe')
+@click.option('--ordered/--unordered', default=True)
+@click.option('--normalize', is_flag=True, default=False)
+def process(operation, lang, input, output, backend, workers, chunk_size,
+            extractor, ordered, normalize):
     if operation == 'extract_arts':
-        proc = ArtsProcessor(lang, input, output) 
+        proc = ArtsProcessor(lang, input, output, backend, workers, extractor,
+                             chunk_size)
     elif operation == 'extract_sents':
-        proc = SentProcessor(lang, input, output) 
+        proc = SentProcessor(lang, input, output, workers or 1, chunk_size,
+                             ordered)
+    elif operation == 'dedup_sents':
+        # the input is a glob pattern matching the sentence files
+        proc = DedupProcessor(lang, sorted(glob.glob(input)), output,
+                              normalize)
+    elif operation == 'dedup_arts':
+        proc = NearDupProcessor(lang, input, output, backend)
     elif operation == 'extract_genres':
         proc = TopicProcessor(lang, input, output) 
     else:
@@ -8,6 +8,7 @@ import os
 import csv
 import io
 import json
+import sqlite3
 from hashlib import sha1
 from types import FunctionType
 
@@ -21,6 +22,15 @@ class JsonEncoder:
         return json.loads(txt)
 
 
+class JsonLineEncoder:
+
+    def encode(self, obj):
+        return json.dumps(obj, ensure_ascii=False)
+
+    def decode(self, txt):
+        return json.loads(txt)
+
+
 class PlainEncoder:
 
     def encode(self, obj):
@@ -49,6 +59,8 @@ def get_encoder(scheme):
         return PlainEncoder()
     elif scheme == 'json':
         return JsonEncoder()
+    elif scheme == 'jsonl':
+        return JsonLineEncoder()
     elif scheme == 'csv':
         return CsvEncoder()
 
@@ -59,16 +71,41 @@ class FileCorpus:
         self.lang = lang
         self.root_path = path
         self.sep = sep
+        self.header = header
         self.write_fp = open(self.root_path, 'a', encoding='utf-8', buffering=8192)
         self.encoder = get_encoder(encoding)
 
-        if header:
-            next(self.write_fp)
+    def byte_ranges(self, n):
+        """
+        Splits the file into `n` byte ranges of about the same size, to be
+        passed to `all_instances`
+        """
+        size = os.path.getsize(self.root_path)
+        bounds = [size * i // n for i in range(n + 1)]
+        return list(zip(bounds[:-1], bounds[1:]))
 
-    def all_instances(self):
-        with open(self.root_path, 'r', encoding='utf-8') as fp:
-            for line in fp.readlines():
-                yield line.rstrip('\n')
+    def all_instances(self, start=0, end=None):
+        """
+        Streams the lines of the file with constant memory. If a byte range
+        is given, only the lines that begin within [start, end) are yielded,
+        so that disjoint ranges never share or split a line.
+        """
+        with open(self.root_path, 'rb', buffering=1 << 20) as fp:
+            if start > 0:
+                # the line starting just before `start` belongs to the
+                # previous range; if a line starts at `start`, this reads
+                # only the preceding newline
+                fp.seek(start - 1)
+                pos = start - 1 + len(fp.readline())
+            else:
+                pos = 0
+                if self.header:
+                    pos += len(fp.readline())
+            for line in fp:
+                if end is not None and pos >= end:
+                    break
+                pos += len(line)
+                yield line.rstrip(b'\r\n').decode('utf-8')
 
     def add_instance(self, obj):
         txt = self.encoder.encode(obj)
@@ -78,6 +115,99 @@ class FileCorpus:
     def flush(self):
         self.write_fp.flush()
 
+    def get_stats(self, exact=False, workers=None):
+        """
+        See `stats.CorpusStats`
+        """
+        from .stats import file_stats
+        self.flush()
+        return file_stats(self, exact, workers)
+
+
+def url_hash(url):
+    return sha1(url.encode('utf-8')).hexdigest()
+
+
+class UrlIndex:
+    """
+    A persistent map from url hashes to the location of their instances in
+    a corpus, stored in an sqlite database
+
+    A location is a tuple (shard, offset, length, pos, timestamp) whose
+    meaning is up to the corpus. Changes are committed every
+    `commit_every` additions and on `flush`.
+    """
+
+    FNAME = '.urls.db'
+
+    def __init__(self, path, commit_every=1000):
+        self.path = path
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        # the spiders add to the index from a writer thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS urls (hash TEXT PRIMARY '
+                          'KEY, shard, offset INTEGER, length INTEGER, pos '
+                          'INTEGER, timestamp TEXT) WITHOUT ROWID')
+        self.size = self.conn.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return self.lookup(key) is not None
+
+    def lookup(self, key):
+        return self.conn.execute('SELECT shard, offset, length, pos, timestamp '
+                                 'FROM urls WHERE hash = ?', (key,)).fetchone()
+
+    def add(self, key, shard, offset, length, pos=0, timestamp=None):
+        row = (shard, offset, length, pos, timestamp, key)
+        cur = self.conn.execute('UPDATE urls SET shard = ?, offset = ?, '
+                                'length = ?, pos = ?, timestamp = ? '
+                                'WHERE hash = ?', row)
+        if cur.rowcount == 0:
+            self.conn.execute('INSERT INTO urls (shard, offset, length, pos, '
+                              'timestamp, hash) VALUES (?, ?, ?, ?, ?, ?)', row)
+            self.size += 1
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self.flush()
+
+    def keys(self):
+        for row in self.conn.execute('SELECT hash FROM urls'):
+            yield row[0]
+
+    def drop_from(self, shard, offset):
+        """
+        Drops the locations at or past `offset` in `shard`, and those in
+        later shards
+        """
+        cur = self.conn.execute('DELETE FROM urls WHERE shard > ? OR '
+                                '(shard = ? AND offset >= ?)',
+                                (shard, shard, offset))
+        self.size -= cur.rowcount
+        self.flush()
+
+    def flush(self):
+        self.conn.commit()
+        self.uncommitted = 0
+
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def read_text(path):
+    """
+    Reads a file of a corpus, decompressing it if it is a zstd frame
+    """
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    if data[:4] == ZSTD_MAGIC:
+        import zstandard
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode('utf-8')
+
 
 class DirCorpus:
 
@@ -85,6 +215,7 @@ class DirCorpus:
         self.lang = lang
         self.root_path = path
         self.encoder = get_encoder(encoding)
+        self.decode_errors = 0
 
     def get_path(self, instance):
         """
@@ -95,12 +226,22 @@ class DirCorpus:
     def all_instances(self):
         for (dirpath, _, fnames) in os.walk(self.root_path):
             for fname in fnames:
+                if fname.startswith('.'):
+                    continue
                 fpath = os.path.join(dirpath, fname)
                 try:
-                    with open(fpath, encoding='utf-8') as fp:
-                        yield self.encoder.decode(fp.read())
+                    instance = self.encoder.decode(read_text(fpath))
                 except:
-                    pass
+                    self.decode_errors += 1
+                    continue
+                yield instance
+
+    def get_stats(self, exact=False):
+        """
+        See `stats.CorpusStats`
+        """
+        from .stats import article_stats
+        return article_stats(self, exact)
 
     def add_instance(self, instance):
         relpath = self.get_path(instance)
@@ -109,11 +250,362 @@ class DirCorpus:
         with open(abspath, 'w', encoding='utf-8') as fp:
             fp.write(self.encoder.encode(instance))
 
+    def flush(self):
+        pass
+
 
 class NewsCorpus(DirCorpus):
+    """
+    A corpus of crawled pages, stored as one file per page under
+    `<source>/<url hash>`. An index of the stored urls supports `get`,
+    `in` and `len` without walking the directory tree. Pages with html,
+    which is stored as crawled, are compressed with zstd.
+
+    A spider opens the corpus for its `source` only. The index then covers
+    the pages of that source and is kept in their directory, `state_path`,
+    along with the other files of the spider, so that spiders of several
+    sources can store their pages under the same path at the same time.
+    """
+
+    def __init__(self, lang, path, encoding='json', source=None):
+        super().__init__(lang, path, encoding)
+        self.source = source
+        self.state_path = os.path.join(path, source) if source else path
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            index_path = os.path.join(self.state_path, UrlIndex.FNAME)
+            exists = os.path.isfile(index_path)
+            os.makedirs(self.state_path, exist_ok=True)
+            self._index = UrlIndex(index_path)
+            if not exists:
+                self.rebuild_index()
+        return self._index
+
+    def rebuild_index(self):
+        """
+        Indexes the pages that are on disk but not yet in the index, e.g.
+        the ones written before the index existed
+        """
+        sources = [self.source] if self.source else os.listdir(self.root_path)
+        for source in sources:
+            dirpath = os.path.join(self.root_path, source)
+            if source.startswith('.') or not os.path.isdir(dirpath):
+                continue
+            for fname in os.listdir(dirpath):
+                if not fname.startswith('.') and fname not in self._index:
+                    fsize = os.path.getsize(os.path.join(dirpath, fname))
+                    self._index.add(fname, os.path.join(source, fname), 0,
+                                    fsize)
+        self._index.flush()
 
     def get_path(self, instance):
         url = instance['url']
         source = instance['source']
-        fname = sha1(url.encode('utf-8')).hexdigest()
+        fname = url_hash(url)
         return os.path.join(source, fname)
+
+    def add_instance(self, instance):
+        data = self.encoder.encode(instance).encode('utf-8')
+        if 'html' in instance:
+            import zstandard
+            data = zstandard.ZstdCompressor().compress(data)
+        relpath = self.get_path(instance)
+        abspath = os.path.join(self.root_path, relpath)
+        os.makedirs(os.path.dirname(abspath), exist_ok=True)
+        with open(abspath, 'wb') as fp:
+            fp.write(data)
+        self.index.add(url_hash(instance['url']), relpath, 0, len(data),
+                       timestamp=instance.get('timestamp'))
+
+    def get(self, url):
+        loc = self.index.lookup(url_hash(url))
+        if loc is None:
+            return None
+        return self.encoder.decode(read_text(os.path.join(self.root_path,
+                                                          loc[0])))
+
+    def __contains__(self, url):
+        return url_hash(url) in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def flush(self):
+        if self._index is not None:
+            self._index.flush()
+
+
+class ShardCorpus:
+    """
+    A corpus stored in a few large shard files instead of one file per
+    instance
+
+    Instances are encoded as JSON lines and buffered into blocks of
+    `block_size` instances. Every block is compressed with zstd and appended
+    to the current shard, which is rolled over once it grows beyond
+    `shard_size` bytes. The location of every block is recorded in a small
+    index file, so reading never needs to scan the shards. Instances having
+    an url are also recorded in an `UrlIndex`, which supports `get`, `in`
+    and `len`.
+
+    A corpus has a single writer at a time, and instances added since the
+    last `flush` are not visible on disk. The spiders thus store the pages
+    of every source in a corpus of its own, in a subdirectory named after
+    the source (see `get_news_corpus`).
+    """
+
+    INDEX_FNAME = 'blocks.idx'
+
+    def __init__(self, lang, path, block_size=256, shard_size=256 << 20):
+        self.lang = lang
+        self.root_path = path
+        self.state_path = path
+        self.block_size = block_size
+        self.shard_size = shard_size
+        self.encoder = get_encoder('jsonl')
+        self.index_path = os.path.join(self.root_path, self.INDEX_FNAME)
+        self.pending = []
+        self.pending_keys = {}
+        self.shard = None
+        self._index = None
+
+        os.makedirs(self.root_path, exist_ok=True)
+
+    @property
+    def index(self):
+        if self._index is None:
+            index_path = os.path.join(self.root_path, UrlIndex.FNAME)
+            exists = os.path.isfile(index_path)
+            self._index = UrlIndex(index_path)
+            if not exists:
+                self.rebuild_index()
+        return self._index
+
+    def rebuild_index(self):
+        """
+        Indexes all the instances having an url, e.g. after the index file
+        has been lost
+        """
+        for shard, offset, length, _ in self.blocks():
+            data = self.read_block(shard, offset, length)
+            pos = 0
+            for line in data.split(b'\n')[:-1]:
+                instance = self.encoder.decode(line.decode('utf-8'))
+                if 'url' in instance:
+                    self._index.add(url_hash(instance['url']), shard, offset,
+                                    length, pos, instance.get('timestamp'))
+                pos += len(line) + 1
+        self._index.flush()
+
+    @property
+    def index_size(self):
+        """
+        The size of the block index in bytes, which grows with every block
+        """
+        if not os.path.isfile(self.index_path):
+            return 0
+        return os.path.getsize(self.index_path)
+
+    def shard_path(self, shard):
+        return os.path.join(self.root_path, '{:05d}.jsonl.zst'.format(shard))
+
+    def blocks(self):
+        """
+        Returns a list of (shard, offset, length, count) for every block
+        """
+        if not os.path.isfile(self.index_path):
+            return []
+        with open(self.index_path, encoding='utf-8') as fp:
+            return [tuple(map(int, line.split('\t'))) for line in fp]
+
+    def read_block(self, shard, offset, length):
+        import zstandard
+        with open(self.shard_path(shard), 'rb') as fp:
+            fp.seek(offset)
+            data = fp.read(length)
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    def all_instances(self):
+        for shard, offset, length, _ in self.blocks():
+            data = self.read_block(shard, offset, length)
+            # the encoded instances never contain a raw newline, but may
+            # contain other line breaks that splitlines() would split on
+            for line in data.decode('utf-8').split('\n')[:-1]:
+                yield self.encoder.decode(line)
+
+    def get_stats(self, exact=False):
+        """
+        See `stats.CorpusStats`
+        """
+        from .stats import article_stats
+        return article_stats(self, exact)
+
+    def add_instance(self, instance):
+        key = url_hash(instance['url']) if 'url' in instance else None
+        if key:
+            self.pending_keys[key] = len(self.pending)
+        self.pending.append((self.encoder.encode(instance), key,
+                             instance.get('timestamp')))
+        if len(self.pending) >= self.block_size:
+            self.flush()
+
+    def get(self, url):
+        key = url_hash(url)
+        if key in self.pending_keys:
+            return self.encoder.decode(self.pending[self.pending_keys[key]][0])
+        loc = self.index.lookup(key)
+        if loc is None:
+            return None
+        shard, offset, length, pos, _ = loc
+        data = self.read_block(shard, offset, length)
+        end = data.index(b'\n', pos)
+        return self.encoder.decode(data[pos:end].decode('utf-8'))
+
+    def __contains__(self, url):
+        key = url_hash(url)
+        return key in self.pending_keys or key in self.index
+
+    def __len__(self):
+        unindexed = [key for key in self.pending_keys if key not in self.index]
+        return len(self.index) + len(unindexed)
+
+    def truncate(self, index_size):
+        """
+        Drops the blocks recorded past the first `index_size` bytes of the
+        block index, e.g. those written after the last checkpoint of a
+        crashed run, along with their data and their urls
+        """
+        with open(self.index_path, 'r+b') as fp:
+            fp.seek(index_size)
+            # the last line may be cut short by a crash
+            dropped = [tuple(map(int, line.split(b'\t')[:2]))
+                       for line in fp.read().split(b'\n')
+                       if line.count(b'\t') == 3]
+            fp.truncate(index_size)
+        if not dropped:
+            return
+        shard, offset = dropped[0]
+        for later in set(s for s, _ in dropped if s != shard):
+            os.remove(self.shard_path(later))
+        if offset == 0:
+            os.remove(self.shard_path(shard))
+        else:
+            with open(self.shard_path(shard), 'r+b') as fp:
+                fp.truncate(offset)
+        self.index.drop_from(shard, offset)
+        self.shard = None
+
+    def _next_shard(self):
+        # never append to a shard written by an earlier writer: it may end
+        # with a partial block that was never indexed
+        shards = [shard for shard, _, _, _ in self.blocks()]
+        shard = max(shards) + 1 if shards else 0
+        while os.path.exists(self.shard_path(shard)):
+            shard += 1
+        return shard
+
+    def flush(self):
+        if not self.pending:
+            if self._index is not None:
+                self._index.flush()
+            return
+        import zstandard
+        lines = [txt.encode('utf-8') for txt, _, _ in self.pending]
+        data = b'\n'.join(lines) + b'\n'
+        block = zstandard.ZstdCompressor().compress(data)
+
+        if self.shard is None or \
+           os.path.getsize(self.shard_path(self.shard)) >= self.shard_size:
+            self.shard = self._next_shard()
+
+        with open(self.shard_path(self.shard), 'ab') as fp:
+            offset = fp.tell()
+            fp.write(block)
+        with open(self.index_path, 'a', encoding='utf-8') as fp:
+            fp.write('{}\t{}\t{}\t{}\n'.format(self.shard, offset, len(block),
+                                                len(self.pending)))
+
+        pos = 0
+        for line, (_, key, timestamp) in zip(lines, self.pending):
+            if key:
+                self.index.add(key, self.shard, offset, len(block), pos,
+                               timestamp)
+            pos += len(line) + 1
+        self.index.flush()
+
+        self.pending = []
+        self.pending_keys = {}
+
+
+class MultiShardCorpus:
+    """
+    Reads the shard corpora at `path` and in its subdirectories as one
+    corpus, e.g. the pages stored by the spiders of several sources
+    """
+
+    def __init__(self, lang, path):
+        self.lang = lang
+        self.root_path = path
+        self.corpora = [ShardCorpus(lang, corpus_path)
+                        for corpus_path in _shard_corpora(path)]
+
+    def all_instances(self):
+        for corpus in self.corpora:
+            yield from corpus.all_instances()
+
+    def get_stats(self, exact=False):
+        """
+        See `stats.CorpusStats`
+        """
+        from .stats import article_stats
+        return article_stats(self, exact)
+
+    def get(self, url):
+        for corpus in self.corpora:
+            instance = corpus.get(url)
+            if instance is not None:
+                return instance
+        return None
+
+    def __contains__(self, url):
+        return any(url in corpus for corpus in self.corpora)
+
+    def __len__(self):
+        return sum(len(corpus) for corpus in self.corpora)
+
+
+def _shard_corpora(path):
+    paths = [path] + sorted(os.path.join(path, name)
+                            for name in os.listdir(path)
+                            if not name.startswith('.'))
+    return [corpus_path for corpus_path in paths if os.path.isfile(
+        os.path.join(corpus_path, ShardCorpus.INDEX_FNAME))]
+
+
+def get_news_corpus(lang, path, backend=None, source=None):
+    """
+    Opens the news corpus at `path`. `backend` is either 'dir', for one
+    JSON file per page, or 'shard', for a `ShardCorpus`. If it is not
+    given, it is detected from the contents of `path`, with 'dir' being the
+    default for a new corpus
+
+    The spiders open the corpus of their `source`, which has a shard corpus
+    of its own in `<path>/<source>`. Without a `source`, the shard corpora
+    of all the sources under `path` are read together.
+    """
+    shard_paths = _shard_corpora(path) if os.path.isdir(path) else []
+    if backend is None:
+        backend = 'shard' if shard_paths else 'dir'
+
+    if backend == 'dir':
+        return NewsCorpus(lang, path, source=source)
+    elif backend == 'shard' and source:
+        return ShardCorpus(lang, os.path.join(path, source))
+    elif backend == 'shard' and shard_paths not in ([], [path]):
+        return MultiShardCorpus(lang, path)
+    elif backend == 'shard':
+        return ShardCorpus(lang, path)
+    raise ValueError('Unknown corpus backend: {}'.format(backend))
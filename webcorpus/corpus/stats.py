@@ -0,0 +1,205 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Statistics of a corpus, computed in a single pass
+
+The statistics of parts of a corpus can be merged, so a large file is split
+into byte ranges that are processed in parallel.
+
+"""
+import multiprocessing as mp
+import numpy as np
+
+from hashlib import blake2b
+from itertools import islice
+from ..language import code2script, script_mask
+
+
+def hash_tokens(tokens):
+    """
+    64-bit hashes of the tokens, the same in every process
+    """
+    digests = b''.join(blake2b(token.encode('utf-8'), digest_size=8).digest()
+                       for token in tokens)
+    return np.frombuffer(digests, dtype='<u8')
+
+
+def _bit_length(x):
+    # float64 represents 32-bit integers exactly, so the logarithm of each
+    # half of the 64-bit values gives the exact bit length
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xffffffff)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        hi_len = np.floor(np.log2(hi)) + 1
+        lo_len = np.floor(np.log2(lo)) + 1
+    return np.where(hi > 0, 32 + hi_len, np.where(lo > 0, lo_len, 0))
+
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct 64-bit hashes added to it, with a
+    relative error of about 1.04 / sqrt(2 ** p), in 2 ** p bytes
+    """
+
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - _bit_length(rest) + 1
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def __len__(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class CorpusStats:
+    """
+    Line, token and character counts, distinct tokens, and the distribution
+    of the length (in tokens) and script purity (fraction of characters
+    accepted by the sentence filters: the script of the language, digits,
+    whitespace and punctuation) of the lines
+
+    Distinct tokens are counted exactly with a set of the tokens if `exact`
+    is set, or else estimated with a HyperLogLog in constant memory.
+    """
+
+    PURITY_BINS = 10
+    MAX_LEN = 200
+
+    def __init__(self, lang, exact=False):
+        self.lang = lang
+        self.script = code2script(lang)
+        self.exact = exact
+        self.lines = 0
+        self.tokens = 0
+        self.chars = 0
+        self.vocab = set() if exact else HyperLogLog()
+        self.purity_hist = np.zeros(self.PURITY_BINS + 1, dtype=np.int64)
+        self.length_hist = np.zeros(self.MAX_LEN + 1, dtype=np.int64)
+
+    def update(self, lines):
+        """
+        Adds a batch of lines
+        """
+        if not lines:
+            return
+        ntokens = np.zeros(len(lines), dtype=np.int64)
+        vocab = set()
+        for i, line in enumerate(lines):
+            tokens = line.split()
+            ntokens[i] = len(tokens)
+            vocab.update(tokens)
+        if self.exact:
+            self.vocab |= vocab
+        else:
+            self.vocab.add(hash_tokens(vocab))
+
+        lens = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+        # one mask for the whole batch, over the lines joined by newlines;
+        # the sums below only cover the characters of each line, so the
+        # separators are left out even though whitespace is in the script
+        mask = script_mask('\n'.join(lines), self.script, digits=True)
+        csum = np.zeros(len(mask) + 1, dtype=np.int64)
+        np.cumsum(mask, out=csum[1:])
+        starts = np.cumsum(lens + 1) - lens - 1
+        in_script = csum[starts + lens] - csum[starts]
+        nonempty = lens > 0
+        purity = in_script[nonempty] / lens[nonempty]
+        bins = np.floor(purity * self.PURITY_BINS).astype(np.int64)
+
+        self.lines += len(lines)
+        self.tokens += int(ntokens.sum())
+        self.chars += int(lens.sum())
+        self.purity_hist += np.bincount(bins, minlength=self.PURITY_BINS + 1)
+        self.length_hist += np.bincount(np.minimum(ntokens, self.MAX_LEN),
+                                        minlength=self.MAX_LEN + 1)
+
+    def merge(self, other):
+        self.lines += other.lines
+        self.tokens += other.tokens
+        self.chars += other.chars
+        if self.exact:
+            self.vocab |= other.vocab
+        else:
+            self.vocab.merge(other.vocab)
+        self.purity_hist += other.purity_hist
+        self.length_hist += other.length_hist
+        return self
+
+    def as_dict(self):
+        """
+        The purity histogram has a bin for every tenth, the last bin holding
+        the lines entirely in the script, and the length histogram has a bin
+        for every length up to `MAX_LEN`, the last bin holding the longer
+        lines
+        """
+        return {
+            'lines': self.lines,
+            'tokens': self.tokens,
+            'chars': self.chars,
+            'unique_tokens': len(self.vocab),
+            'purity_hist': self.purity_hist.tolist(),
+            'length_hist': self.length_hist.tolist()
+        }
+
+
+def _range_stats(args):
+    lang, path, start, end, exact, chunk_size = args
+    from . import FileCorpus
+    lines = FileCorpus(lang, path).all_instances(start, end)
+    stats = CorpusStats(lang, exact)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            break
+        stats.update(chunk)
+    return stats
+
+
+def file_stats(corpus, exact=False, workers=None, chunk_size=10000):
+    """
+    Statistics of a `FileCorpus`, computed over `workers` byte ranges of
+    the file in parallel
+    """
+    workers = workers or mp.cpu_count()
+    tasks = [(corpus.lang, corpus.root_path, start, end, exact, chunk_size)
+             for start, end in corpus.byte_ranges(workers)]
+    if workers == 1:
+        parts = [_range_stats(tasks[0])]
+    else:
+        with mp.Pool(workers) as pool:
+            parts = pool.map(_range_stats, tasks)
+    stats = parts[0]
+    for part in parts[1:]:
+        stats.merge(part)
+    return stats.as_dict()
+
+
+def article_stats(corpus, exact=False, chunk_size=10000):
+    """
+    Statistics of the article bodies in a news corpus, one line per
+    paragraph
+    """
+    stats = CorpusStats(corpus.lang, exact)
+    chunk = []
+    for article in corpus.all_instances():
+        chunk += article.get('body', '').split('\n')
+        if len(chunk) >= chunk_size:
+            stats.update(chunk)
+            chunk = []
+    stats.update(chunk)
+    return stats.as_dict()
@@ -0,0 +1,133 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Fetch ledger of the pages of a news corpus, for incremental recrawls
+
+"""
+import os
+import re
+import sqlite3
+import time
+
+from hashlib import blake2b
+from ..corpus import url_hash
+
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# parts of a page that change on every fetch without its text changing:
+# scripts (ad slots, cache busters, csrf tokens), styles and comments
+_VOLATILE = re.compile(rb'<(script|style|noscript)\b.*?</\1\s*>|<!--.*?-->',
+                       re.IGNORECASE | re.DOTALL)
+_SPACES = re.compile(rb'\s+')
+
+
+def content_hash(body):
+    """
+    A hash of the html of a page that leaves out its volatile parts and
+    its whitespace
+    """
+    body = _SPACES.sub(b'', _VOLATILE.sub(b'', body))
+    return blake2b(body, digest_size=16).hexdigest()
+
+
+class FetchLedger:
+    """
+    Records, for every page stored by a spider, the validators sent back by
+    the server (ETag and Last-Modified), a hash of the content (see
+    `content_hash`) and when the page is due to be fetched again
+
+    The revisit interval of a page adapts to how often it changes: it is
+    halved whenever the page is found changed and doubled whenever it is
+    not, within [`min_interval`, `max_interval`]. Section and home pages
+    thus end up being fetched often, and articles hardly ever.
+    """
+
+    FNAME = '.fetch-ledger.db'
+
+    def __init__(self, path, min_interval=HOUR, max_interval=30 * DAY,
+                 first_interval=DAY, commit_every=100):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.first_interval = first_interval
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS pages (hash TEXT '
+                          'PRIMARY KEY, etag TEXT, last_modified TEXT, '
+                          'content_hash TEXT, fetched REAL, interval REAL, '
+                          'next_visit REAL) WITHOUT ROWID')
+
+    @classmethod
+    def for_corpus(cls, corpus, **kwargs):
+        return cls(os.path.join(corpus.state_path, cls.FNAME), **kwargs)
+
+    def lookup(self, url):
+        """
+        Returns (etag, last_modified, content_hash, fetched, interval,
+        next_visit) of a page, or None if it is not in the ledger
+        """
+        return self.conn.execute('SELECT etag, last_modified, content_hash, '
+                                 'fetched, interval, next_visit FROM pages '
+                                 'WHERE hash = ?',
+                                 (url_hash(url),)).fetchone()
+
+    def is_due(self, url, now=None):
+        """
+        Pages stored before the ledger existed are always due
+        """
+        row = self.lookup(url)
+        return row is None or row[5] <= (now or time.time())
+
+    def headers(self, url):
+        """
+        The conditional request headers for a page
+        """
+        row = self.lookup(url)
+        headers = {}
+        if row is not None and row[0]:
+            headers['If-None-Match'] = row[0]
+        if row is not None and row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def record(self, response):
+        """
+        Records a fetch of a page, a 200 or a 304 response, and returns
+        whether the page has changed since it was last recorded
+        """
+        url = response.request.url
+        row = self.lookup(url)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        etag = etag.decode('latin-1') if etag else row and row[0]
+        last_modified = last_modified.decode('latin-1') if last_modified \
+            else row and row[1]
+
+        if response.status == 304:
+            digest = row and row[2]
+        else:
+            digest = content_hash(response.body)
+        changed = row is None or digest != row[2]
+
+        if row is None:
+            interval = self.first_interval
+        elif changed:
+            interval = max(row[4] / 2, self.min_interval)
+        else:
+            interval = min(row[4] * 2, self.max_interval)
+        now = time.time()
+        self.conn.execute('INSERT OR REPLACE INTO pages (hash, etag, '
+                          'last_modified, content_hash, fetched, interval, '
+                          'next_visit) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                          (url_hash(url), etag, last_modified, digest, now,
+                           interval, now + interval))
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self.flush()
+        return changed
+
+    def flush(self):
+        self.conn.commit()
+        self.uncommitted = 0
@@ -0,0 +1,21 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Downloader middlewares of the spiders
+
+"""
+
+
+class ConditionalRequestMiddleware:
+    """
+    Makes the requests for the pages in the fetch ledger of a recrawling
+    spider conditional, so that unchanged pages come back as an empty 304
+    """
+
+    def process_request(self, request, spider):
+        ledger = getattr(spider, 'ledger', None)
+        if ledger is None:
+            return None
+        for name, value in ledger.headers(request.url).items():
+            request.headers.setdefault(name, value)
+        return None
@@ -19,13 +19,16 @@ import json
 import os
 import tldextract
 
-from lxml.html.clean import Cleaner
+from scrapy.http import HtmlResponse
 from scrapy.linkextractors import LinkExtractor
 from scrapy.selector import Selector
 from datetime import datetime
 from twisted.internet import task
-from ..corpus import NewsCorpus
+from ..corpus import get_news_corpus
 from ..language import code2script
+from .ledger import FetchLedger
+from .seen import HubPages, SeenUrls, fingerprint
+from .sitemap import iter_sitemap, modified_since, robots_sitemaps
 from datetime import date, timedelta
 
 
@@ -43,10 +46,6 @@ class BaseNewsSpider(scrapy.Spider):
         self.pages_crawled = 0
         self.recent_pgcnt = 0
         self.recent_pgcnts = [0, 0, 0, 0, 0, 0]
-        self.cleaner = Cleaner(scripts=True, javascript=True, style=True,
-                               comments=True, links=False, meta=False,
-                               page_structure=False, embedded=True,
-                               frames=True, forms=False, annoying_tags=False)
 
         os.makedirs(self.html_path, exist_ok=True)
 
@@ -58,7 +57,32 @@ class BaseNewsSpider(scrapy.Spider):
 
         self.allowed_domains = [domain]
 
-        self.html_corpus = NewsCorpus(self.lang, self.html_path)
+        # the pages of every source are kept apart, so that spiders of
+        # several sources can share `html_path`
+        self.html_corpus = get_news_corpus(self.lang, self.html_path,
+                                           kwargs.get('corpus_backend'),
+                                           self.name)
+        # pages stored by this and earlier runs, which are only added once
+        # the pipeline has written them
+        self.seen = SeenUrls(self.html_corpus)
+        self.redirects = {}
+        # stored pages that are fetched again for their links, unless the
+        # ledger decides when pages are due
+        self.hubs = HubPages(self.html_corpus)
+        # in recrawl mode, stored pages are fetched again when they are due,
+        # with conditional requests
+        self.ledger = None
+        self.stored_pages = None
+        if int(kwargs.get('recrawl', 0)):
+            self.ledger = FetchLedger.for_corpus(self.html_corpus)
+            # the answer to a conditional request for an unchanged page;
+            # other spiders leave it to HttpErrorMiddleware
+            self.handle_httpstatus_list = [304]
+            # a reader of its own, as the pipeline writes to html_corpus
+            # from another thread
+            self.stored_pages = get_news_corpus(self.lang, self.html_path,
+                                                kwargs.get('corpus_backend'),
+                                                self.name)
 
         super().__init__(self.name)
 
@@ -79,57 +103,159 @@ class BaseNewsSpider(scrapy.Spider):
         with open(self.log_file, 'w') as fp:
             json.dump(stats, fp)
 
-    def write_html(self, response):
-        html = self.cleaner.clean_html(response.text)
+    def html_item(self, response):
+        """
+        The page item of a response, stored by `CorpusWriterPipeline`. The
+        html is stored as crawled; it is cleaned by the processors (see
+        `PageContext`), not on the reactor thread. In recrawl mode, None is
+        returned for the pages that have not changed since the last fetch
+        """
+        if response.status == 304 and (self.ledger is None or
+                                       self.ledger.lookup(response.request.url)
+                                       is None):
+            # a 304 that was not asked for, e.g. from a caching proxy, has
+            # no page to store
+            return None
+        if self.ledger is not None and not self.ledger.record(response):
+            return None
         html_page = {
-            'html': html,
+            'html': response.text,
             'source': self.name,
             'url': response.request.url,
             'timestamp': datetime.now().strftime('%d/%m/%y %H:%M')
         }
-        self.html_corpus.add_instance(html_page)
+        # the urls that redirected here lead to the same page
+        if response.meta.get('redirect_urls'):
+            self.redirects[html_page['url']] = response.meta['redirect_urls']
         self.pages_crawled += 1
         self.recent_pgcnt += 1
-        return html
+        return html_page
+
+    def page_stored(self, page):
+        """
+        Called by the pipeline once a page has been written
+        """
+        self.seen.add(page['url'])
+        for url in self.redirects.pop(page['url'], []):
+            self.seen.add(url)
+
+    def wanted(self, url):
+        """
+        Pages stored by an earlier run are not fetched again, unless they
+        are due for a recrawl, or, without the ledger, are hubs
+        """
+        if url not in self.seen:
+            return True
+        if self.ledger is not None:
+            return self.ledger.is_due(url)
+        return url in self.hubs
+
+    def stored_response(self, response):
+        """
+        The stored copy of a page that came back unchanged (304), or None
+        if there is none
+        """
+        if self.stored_pages is None:
+            return None
+        page = self.stored_pages.get(response.request.url)
+        if page is None:
+            return None
+        return HtmlResponse(url=response.url, body=page['html'],
+                            encoding='utf-8', request=response.request)
 
     def parse(self, response):
         raise NotImplementedError
 
     def closed(self, reason):
+        # the pages have been flushed by the pipeline already
         print('Closing spider. Name: ', self.name, ' Reason: ', reason)
+        self.seen.save()
+        self.hubs.save()
+        if self.ledger is not None:
+            self.ledger.flush()
         # self.store.upload(self.html_corpus, 'html')
 
 
-class SitemapSpider(BaseNewsSpider, scrapy.spiders.SitemapSpider):
+class SitemapSpider(BaseNewsSpider):
+    """
+    Fetches the pages listed in the sitemap of a source, following sitemap
+    indexes. With `since` ('YYYY-MM-DD'), only the pages and sitemaps whose
+    lastmod is not earlier are fetched. The sitemap url may also be that of
+    a robots.txt listing the sitemaps
+    """
 
     name = 'sitemap-spider'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.sitemap_urls = [kwargs['sitemap_url']]
+        # the sitemaps are the start urls, parsed by `parse`
+        self.start_urls = [kwargs['sitemap_url']]
+        self.since = kwargs.get('since') or None
 
     def parse(self, response):
-        self.write_html(response)
+        if response.url.endswith('/robots.txt'):
+            for url in robots_sitemaps(response.body):
+                yield scrapy.Request(url)
+            return
+        # a gzipped sitemap may not decompress to more than a download
+        max_size = self.settings.getint('DOWNLOAD_MAXSIZE')
+        for kind, loc, lastmod in iter_sitemap(response.body, max_size):
+            if not modified_since(lastmod, self.since):
+                continue
+            if kind == 'sitemap':
+                yield scrapy.Request(loc)
+            elif self.wanted(loc):
+                yield scrapy.Request(loc, callback=self.parse_page)
+
+    def parse_page(self, response):
+        item = self.html_item(response)
+        if item is not None:
+            yield item
 
 
 class RecursiveSpider(BaseNewsSpider):
+    """
+    Starts at the home page and follows the links within the source. The
+    pages that lead to new pages are recorded as hubs (see `HubPages`), so
+    that a rerun fetches them again and finds the new articles behind the
+    section pages
+    """
 
     name = 'recursive-spider'
 
     def __init__(self, *args, **kwargs):
         self.start_urls = [kwargs['home_url']]
         self.link_extractor = LinkExtractor()
+        # fingerprints of the urls requested by this run
+        self.requested = set()
         super().__init__(*args, **kwargs)
 
     def parse(self, response):
-        self.write_html(response)
+        item = self.html_item(response)
+        if item is not None:
+            yield item
+        if response.status == 304:
+            # the links of an unchanged page may still be due
+            response = self.stored_response(response)
+            if response is None:
+                return
 
         links = self.link_extractor.extract_links(response)
 
         links = filter(lambda l: l.url.startswith(self.home_url), links)
 
+        self.requested.add(fingerprint(response.request.url))
+        new_pages = 0
         for link in links:
-            yield scrapy.Request(link.url)
+            fp = fingerprint(link.url)
+            if fp in self.requested:
+                continue
+            self.requested.add(fp)
+            if link.url not in self.seen:
+                new_pages += 1
+            if self.wanted(link.url):
+                yield scrapy.Request(link.url)
+        self.hubs.visited(response.request.url, new_pages)
 
 
 class SanjevaniSpider(RecursiveSpider):
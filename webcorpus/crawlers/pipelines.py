@@ -0,0 +1,94 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Item pipelines of the spiders
+
+"""
+from twisted.internet import defer, threads
+from twisted.python.threadpool import ThreadPool
+
+
+def _write_batch(corpus, pages):
+    for page in pages:
+        corpus.add_instance(page)
+
+
+class CorpusWriterPipeline:
+    """
+    Stores the pages yielded by a spider in its `html_corpus`
+
+    The pages are buffered and handed to a single writer thread in batches
+    of `batch_size`, so the reactor keeps downloading while the pages are
+    written. At most `max_pending` batches wait for the writer; beyond that
+    the items are held back, which in turn holds back the downloads. The
+    remaining pages are written and the corpus flushed when the spider
+    closes.
+
+    The stored pages are passed on without their html, which would
+    otherwise be kept alive and logged with every scraped item.
+    """
+
+    def __init__(self, batch_size=64, max_pending=8):
+        self.batch_size = batch_size
+        self.slots = defer.DeferredSemaphore(max_pending)
+        self.buffer = []
+        self.writes = set()
+        self.pool = None
+        self.reactor = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(settings.getint('CORPUS_WRITE_BATCH_SIZE', 64),
+                   settings.getint('CORPUS_WRITE_MAX_PENDING', 8))
+
+    def open_spider(self, spider):
+        # imported late, so as not to install a reactor before scrapy does
+        from twisted.internet import reactor
+        self.reactor = reactor
+        # a single thread, as the corpora are not thread-safe
+        self.pool = ThreadPool(1, 1, name='corpus-writer')
+        self.pool.start()
+
+    def process_item(self, item, spider):
+        self.buffer.append(item)
+        stored = {'url': item['url'], 'source': item['source']}
+        if len(self.buffer) < self.batch_size:
+            return stored
+        batch, self.buffer = self.buffer, []
+
+        def queue(_):
+            # the slot is held until the batch is written, but the item is
+            # passed on as soon as the batch is queued
+            self.write(batch, spider).addBoth(lambda _: self.slots.release())
+            return stored
+
+        return self.slots.acquire().addCallback(queue)
+
+    def write(self, batch, spider):
+        """
+        Queues a batch for the writer thread
+        """
+        d = threads.deferToThreadPool(self.reactor, self.pool, _write_batch,
+                                      spider.html_corpus, batch)
+        # the pages are only taken as stored once written, so that pages
+        # that failed to be written are fetched again by the next run
+        d.addCallback(lambda _: [spider.page_stored(page) for page in batch])
+        d.addErrback(lambda failure: spider.logger.error(
+            'Failed to write {} pages: {}'.format(len(batch),
+                                                  failure.getErrorMessage())))
+        self.writes.add(d)
+        d.addBoth(lambda _: self.writes.discard(d))
+        return d
+
+    def close_spider(self, spider):
+        if self.buffer:
+            self.write(self.buffer, spider)
+            self.buffer = []
+        d = defer.DeferredList(list(self.writes))
+        d.addCallback(lambda _: threads.deferToThreadPool(
+            self.reactor, self.pool, spider.html_corpus.flush))
+        d.addErrback(lambda failure: spider.logger.error(
+            'Failed to flush the corpus: {}'.format(failure.getErrorMessage())))
+        d.addBoth(lambda _: self.pool.stop())
+        return d
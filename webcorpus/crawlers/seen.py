@@ -0,0 +1,142 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Persistent sets of the urls whose pages a spider has already stored, and
+of the hub pages among them
+
+"""
+import os
+import numpy as np
+
+from ..corpus import url_hash
+
+
+def _fingerprint(key):
+    # the first 64 bits of the url hash
+    return int(key[:16], 16)
+
+
+def fingerprint(url):
+    return _fingerprint(url_hash(url))
+
+
+class SeenUrls:
+    """
+    The urls of the pages stored in a news corpus, as a sorted array of
+    64-bit fingerprints, plus a set of the urls added since the array was
+    last merged with it
+
+    The array is built from the url index of the corpus and cached next to
+    it, in `FNAME`, along with the size of the index at the time. The
+    array may hold more urls than the index, e.g. those that redirected to
+    a stored page. If the index has grown since, because
+    pages were stored without going through `save`, its urls are merged
+    into the cached array.
+    """
+
+    FNAME = '.seen-urls.npz'
+
+    def __init__(self, corpus, merge_every=1 << 16):
+        self.path = os.path.join(corpus.state_path, self.FNAME)
+        self.merge_every = merge_every
+        self.recent = set()
+        self.index = corpus.index
+        self.fps = np.empty(0, dtype=np.uint64)
+        index_len = None
+        if os.path.isfile(self.path):
+            with np.load(self.path) as cache:
+                self.fps = cache['fps']
+                index_len = int(cache['index_len'])
+        if index_len != len(self.index):
+            fps = np.fromiter(map(_fingerprint, self.index.keys()),
+                              dtype=np.uint64, count=len(self.index))
+            self.fps = np.union1d(self.fps, fps)
+
+    def __len__(self):
+        return len(self.fps) + len(self.recent)
+
+    def __contains__(self, url):
+        fp = fingerprint(url)
+        if fp in self.recent:
+            return True
+        pos = np.searchsorted(self.fps, np.uint64(fp))
+        return pos < len(self.fps) and self.fps[pos] == fp
+
+    def add(self, url):
+        if url in self:
+            return
+        self.recent.add(fingerprint(url))
+        if len(self.recent) >= self.merge_every:
+            self.merge()
+
+    def merge(self):
+        recent = np.fromiter(self.recent, dtype=np.uint64,
+                             count=len(self.recent))
+        self.fps = np.union1d(self.fps, recent)
+        self.recent = set()
+
+    def save(self):
+        self.merge()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as fp:
+            np.savez(fp, fps=self.fps, index_len=len(self.index))
+        os.replace(tmp_path, self.path)
+
+
+class HubPages:
+    """
+    The pages of a news corpus that lead to new pages, like the home and
+    section pages, which are fetched again by every run even though they
+    are stored
+
+    A page becomes a hub when it is the first to link to a page that is
+    neither stored nor requested yet. A hub that is fetched `max_misses`
+    times in a row without leading to a new page is dropped, so that
+    articles that happened to link to older articles in the first crawl
+    stop being fetched. A hub that leads to new pages again when it is
+    fetched again is kept for good. The hubs are kept in `FNAME`, next to
+    the url index of the corpus, with the number of misses of each.
+    """
+
+    FNAME = '.hub-pages.npz'
+    # the misses of the hubs that are never dropped
+    KEPT = -1
+
+    def __init__(self, corpus, max_misses=3):
+        self.path = os.path.join(corpus.state_path, self.FNAME)
+        self.max_misses = max_misses
+        self.misses = {}
+        if os.path.isfile(self.path):
+            with np.load(self.path) as cache:
+                self.misses = dict(zip(cache['fps'].tolist(),
+                                       cache['misses'].tolist()))
+
+    def __len__(self):
+        return len(self.misses)
+
+    def __contains__(self, url):
+        return fingerprint(url) in self.misses
+
+    def visited(self, url, new_pages):
+        """
+        Records a fetch of a page that linked to `new_pages` new pages
+        """
+        fp = fingerprint(url)
+        misses = self.misses.get(fp)
+        if new_pages:
+            self.misses[fp] = 0 if misses is None else self.KEPT
+        elif misses is not None and misses != self.KEPT:
+            if misses + 1 >= self.max_misses:
+                del self.misses[fp]
+            else:
+                self.misses[fp] = misses + 1
+
+    def save(self):
+        fps = np.fromiter(self.misses.keys(), dtype=np.uint64,
+                          count=len(self.misses))
+        misses = np.fromiter(self.misses.values(), dtype=np.int64,
+                             count=len(self.misses))
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as fp:
+            np.savez(fp, fps=fps, misses=misses)
+        os.replace(tmp_path, self.path)
@@ -14,6 +14,18 @@ CONCURRENT_REQUESTS_PER_DOMAIN = 512
 CONCURRENT_ITEMS = 1000
 DOWNLOAD_TIMEOUT = 60
 
+DOWNLOADER_MIDDLEWARES = {
+    'webcorpus.crawlers.middlewares.ConditionalRequestMiddleware': 560,
+}
+
+ITEM_PIPELINES = {
+    'webcorpus.crawlers.pipelines.CorpusWriterPipeline': 300,
+}
+# pages are written in batches by a writer thread; once this many batches
+# are waiting for it, the items (and so the downloads) are held back
+CORPUS_WRITE_BATCH_SIZE = 64
+CORPUS_WRITE_MAX_PENDING = 8
+
 RETRY_ENABLED = True
 RETRY_TIMES = 2     # + initial request
 
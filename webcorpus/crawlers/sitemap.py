@@ -0,0 +1,92 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Streaming parser of sitemaps and sitemap indexes
+
+"""
+import gzip
+import io
+
+from lxml import etree
+
+
+class LimitedReader:
+    """
+    A file object that reads at most `limit` bytes of `fp`, and then acts
+    as if it had ended
+    """
+
+    def __init__(self, fp, limit):
+        self.fp = fp
+        self.left = limit
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.left:
+            size = self.left
+        if size <= 0:
+            return b''
+        data = self.fp.read(size)
+        self.left -= len(data)
+        return data
+
+
+def iter_sitemap(body, max_size=0):
+    """
+    Yields a tuple (kind, loc, lastmod) for every entry of a sitemap, where
+    kind is 'url' for a page and 'sitemap' for a sitemap listed by a sitemap
+    index, and lastmod is None if the entry has none. Gzipped sitemaps are
+    decompressed as they are parsed, and the parsed entries are dropped
+    right away, so that big sitemaps are never held whole as a tree.
+    With `max_size`, parsing stops once that many bytes have been
+    decompressed, like a download that exceeds DOWNLOAD_MAXSIZE
+    """
+    fp = io.BytesIO(body)
+    if body[:2] == b'\x1f\x8b':
+        fp = gzip.GzipFile(fileobj=fp)
+        if max_size:
+            fp = LimitedReader(fp, max_size)
+    entries = etree.iterparse(fp, events=('end',),
+                              tag=('{*}url', '{*}sitemap'),
+                              resolve_entities=False, no_network=True,
+                              huge_tree=True, recover=True)
+    try:
+        for _, elem in entries:
+            loc = lastmod = None
+            for child in elem:
+                name = etree.QName(child).localname
+                if name == 'loc':
+                    loc = (child.text or '').strip()
+                elif name == 'lastmod':
+                    lastmod = (child.text or '').strip()
+            if loc:
+                yield etree.QName(elem).localname, loc, lastmod
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    except (etree.XMLSyntaxError, OSError, EOFError):
+        # a truncated or corrupt sitemap; the entries before the error
+        # have been yielded
+        return
+
+
+def robots_sitemaps(body):
+    """
+    The sitemap urls listed in a robots.txt file
+    """
+    for line in body.decode('utf-8', 'ignore').splitlines():
+        if line.lower().startswith('sitemap:'):
+            yield line.split(':', 1)[1].strip()
+
+
+def modified_since(lastmod, since):
+    """
+    Whether a lastmod in W3C datetime format ('YYYY', 'YYYY-MM' or
+    'YYYY-MM-DD' with an optional time) is not earlier than the date
+    `since` ('YYYY-MM-DD'). Only the precision both have is compared, so
+    that a lastmod of '2024-05' is kept for a `since` of '2024-05-01'.
+    Entries without a lastmod are kept
+    """
+    if not since or not lastmod:
+        return True
+    n = min(len(lastmod), len(since))
+    return lastmod[:n] >= since[:n]
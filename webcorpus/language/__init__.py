@@ -3,8 +3,12 @@ Copyright © Divyanshu Kakwani 2019, all rights reserved
 """
 
 import string
+import sys
+import numpy as np
 import unicodedata as ud
 
+from functools import lru_cache
+
 
 LC_NAME = {
     'as': 'assamese',
@@ -76,12 +80,89 @@ def code2script(iso_code):
     return None
 
 
+@lru_cache(maxsize=None)
+def _char_names():
+    """
+    Lower-cased unicode names of all the named codepoints
+    """
+    names = []
+    for cp in range(sys.maxunicode + 1):
+        name = ud.name(chr(cp), None)
+        if name:
+            names.append((cp, name.lower()))
+    return names
+
+
+@lru_cache(maxsize=None)
+def _common_table():
+    """
+    Characters accepted for every script
+    """
+    table = bytearray(sys.maxunicode + 1)
+    for char in '।' + string.punctuation:
+        table[ord(char)] = 1
+    for cp in range(sys.maxunicode + 1):
+        if chr(cp).isspace():
+            table[cp] = 1
+    return bytes(table)
+
+
+@lru_cache(maxsize=None)
+def script_table(script_name):
+    """
+    Returns a table indexed by codepoint, having a non-zero byte for the
+    characters that belong to `script_name`. Like `in_script` always did, a
+    character belongs to the script if its unicode name mentions the script;
+    whitespace, punctuation and the danda are accepted for every script.
+    For a language with no known script (`code2script` gives None), only
+    those are accepted. The table is built once per process and shared by
+    all the lookups
+    """
+    if script_name is None:
+        return _common_table()
+    table = bytearray(_common_table())
+    for cp, name in _char_names():
+        if script_name in name:
+            table[cp] = 1
+    return bytes(table)
+
+
+@lru_cache(maxsize=None)
+def _digit_table():
+    table = bytearray(sys.maxunicode + 1)
+    for cp in range(sys.maxunicode + 1):
+        if chr(cp).isdigit():
+            table[cp] = 1
+    return bytes(table)
+
+
 def in_script(char, script_name):
-    if char == '।' or char.isspace() or char in string.punctuation:
-        return True
-    try:
-        if script_name not in ud.name(char).lower():
-            return False
-    except:
-        return False
-    return True
+    return script_table(script_name)[ord(char)] == 1
+
+
+def _codepoints(text):
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'),
+                         dtype=np.uint32)
+
+
+def script_mask(text, script_name, digits=False):
+    """
+    Returns a boolean array with one entry per character of `text`, set if
+    the character is in the script. If `digits` is set, digits of any
+    script are counted as well
+    """
+    table = np.frombuffer(script_table(script_name), dtype=np.bool_)
+    codes = _codepoints(text)
+    mask = table[codes]
+    if digits:
+        mask |= np.frombuffer(_digit_table(), dtype=np.bool_)[codes]
+    return mask
+
+
+def script_ratio(text, script_name, digits=False):
+    """
+    Fraction of the characters of `text` that are in the script
+    """
+    if not text:
+        return 0.0
+    return float(script_mask(text, script_name, digits).mean())
@@ -4,6 +4,7 @@ Taken from https://github.com/anoopkunchukuttan/indic_nlp_library
 
 import re
 
+from functools import lru_cache
 from . import langinfo
 
 
@@ -662,13 +663,241 @@ class MalayalamNormalizer(BaseNormalizer):
         return text
 
 
+# The steps of every normalizer above, in the order in which its `normalize`
+# applies them: (pattern, replacement) pairs of literal strings, or
+# ('re', pattern, replacement, guard) for regular expressions. 'nasals' marks the
+# nasal normalization and 'nukta' the removal of nuktas, which depend on the
+# options of the normalizer.
+_COMMON_STEPS = [
+    (NormalizerI.BYTE_ORDER_MARK, ""),
+    (NormalizerI.BYTE_ORDER_MARK_2, ""),
+    (NormalizerI.WORD_JOINER, ""),
+    (NormalizerI.SOFT_HYPHEN, ""),
+    (NormalizerI.ZERO_WIDTH_SPACE, " "),
+    (NormalizerI.NO_BREAK_SPACE, " "),
+    (NormalizerI.ZERO_WIDTH_NON_JOINER, ""),
+    (NormalizerI.ZERO_WIDTH_JOINER, ""),
+    "nasals",
+]
+
+
+def _visarga(start, end, visarga):
+    # the last item is a string that every match contains
+    return ("re", r"([{}-{}]):".format(start, end), "\\1" + visarga, ":")
+
+
+_SCRIPT_STEPS = {
+    BaseNormalizer: _COMMON_STEPS,
+    DevanagariNormalizer: _COMMON_STEPS + [
+        ("\u0929", "\u0928\u093C"),
+        ("\u0931", "\u0930\u093C"),
+        ("\u0934", "\u0933\u093C"),
+        ("\u0958", "\u0915\u093C"),
+        ("\u0959", "\u0916\u093C"),
+        ("\u095A", "\u0917\u093C"),
+        ("\u095B", "\u091C\u093C"),
+        ("\u095C", "\u0921\u093C"),
+        ("\u095D", "\u0922\u093C"),
+        ("\u095E", "\u092B\u093C"),
+        ("\u095F", "\u092F\u093C"),
+        "nukta",
+        ("\u007c", "\u0964"),
+        _visarga("\u0900", "\u097f", "\u0903"),
+    ],
+    GurmukhiNormalizer: _COMMON_STEPS + [
+        ("\u0a33", "\u0a32\u0A3C"),
+        ("\u0a36", "\u0a38\u0A3C"),
+        ("\u0a59", "\u0a16\u0A3C"),
+        ("\u0a5a", "\u0a17\u0A3C"),
+        ("\u0a5b", "\u0a1c\u0A3C"),
+        ("\u0a5e", "\u0a2b\u0A3C"),
+        "nukta",
+        ("\u0a64", "\u0964"),
+        ("\u0a65", "\u0965"),
+        ("\u007c", "\u0964"),
+        _visarga("\u0a00", "\u0a7f", "\u0a03"),
+    ],
+    GujaratiNormalizer: _COMMON_STEPS + [
+        "nukta",
+        ("\u0ae4", "\u0964"),
+        ("\u0ae5", "\u0965"),
+        _visarga("\u0a80", "\u0aff", "\u0a83"),
+    ],
+    OriyaNormalizer: _COMMON_STEPS + [
+        ("\u0b5c", "\u0b21\u0B3C"),
+        ("\u0b5d", "\u0b22\u0B3C"),
+        "nukta",
+        ("\u0b64", "\u0964"),
+        ("\u0b65", "\u0965"),
+        ("\u007c", "\u0964"),
+        ("\u0b35", "\u0b2c"),
+        ("\u0b47\u0b56", "\u0b58"),
+        ("\u0b47\u0b3e", "\u0b4b"),
+        ("\u0b47\u0b57", "\u0b4c"),
+        _visarga("\u0b00", "\u0b7f", "\u0b03"),
+    ],
+    BengaliNormalizer: _COMMON_STEPS + [
+        ("\u09dc", "\u09a1\u09BC"),
+        ("\u09dd", "\u09a2\u09BC"),
+        ("\u09df", "\u09af\u09BC"),
+        "nukta",
+        ("\u09e4", "\u0964"),
+        ("\u09e5", "\u0965"),
+        ("\u007c", "\u0964"),
+        ("\u09f7", "\u0964"),
+        ("\u09c7\u09be", "\u09cb"),
+        ("\u09c7\u0bd7", "\u0bcc"),
+        _visarga("\u0980", "\u09ff", "\u0983"),
+    ],
+    TamilNormalizer: _COMMON_STEPS + [
+        ("\u0be4", "\u0964"),
+        ("\u0be5", "\u0965"),
+        ("\u0b92\u0bd7", "\u0b94"),
+        ("\u0bc6\u0bbe", "\u0bca"),
+        ("\u0bc7\u0bbe", "\u0bcb"),
+        ("\u0bc6\u0bd7", "\u0bcc"),
+        _visarga("\u0b80", "\u0bff", "\u0b83"),
+    ],
+    TeluguNormalizer: _COMMON_STEPS + [
+        ("\u0c64", "\u0964"),
+        ("\u0c65", "\u0965"),
+        ("\u0c46\u0c56", "\u0c48"),
+        _visarga("\u0c00", "\u0c7f", "\u0c03"),
+    ],
+    KannadaNormalizer: _COMMON_STEPS + [
+        ("\u0ce4", "\u0964"),
+        ("\u0ce5", "\u0965"),
+        ("\u0cbf\u0cd5", "\u0cc0"),
+        ("\u0cc6\u0cd5", "\u0cc7"),
+        ("\u0cc6\u0cd6", "\u0cc8"),
+        ("\u0cc6\u0cc2", "\u0cca"),
+        ("\u0cca\u0cd5", "\u0ccb"),
+        _visarga("\u0c80", "\u0cff", "\u0c83"),
+    ],
+    MalayalamNormalizer: [
+        ("\u0d23\u0d4d\u200d", "\u0d7a"),
+        ("\u0d28\u0d4d\u200d", "\u0d7b"),
+        ("\u0d30\u0d4d\u200d", "\u0d7c"),
+        ("\u0d32\u0d4d\u200d", "\u0d7d"),
+        ("\u0d33\u0d4d\u200d", "\u0d7e"),
+        ("\u0d15\u0d4d\u200d", "\u0d7f"),
+    ] + _COMMON_STEPS + [
+        ("\u0d64", "\u0964"),
+        ("\u0d65", "\u0965"),
+        ("\u0d46\u0d3e", "\u0d4a"),
+        ("\u0d47\u0d3e", "\u0d4b"),
+        ("\u0d46\u0d57", "\u0d57"),
+        ("\u0d57", "\u0d4c"),
+        _visarga("\u0d00", "\u0d7f", "\u0d03"),
+    ],
+}
+
+
+class CompiledNormalizer(NormalizerI):
+    """
+    Gives the same output as a normalizer above in fewer passes over the
+    text
+
+    The steps of the normalizer are compiled into a short list of passes:
+    * consecutive replacements of single characters are composed into one
+      table, as each of them acts on every character independently. The
+      table is applied by a single regular expression matching any of its
+      characters, which is much faster than `str.translate` on Indic text
+      where such characters are rare
+    * the visarga correction is skipped for text without a colon
+    * longer literals are replaced with `str.replace`, as before
+    """
+
+    def __init__(self, normalizer):
+        self.lang = normalizer.lang
+        self.remove_nuktas = normalizer.remove_nuktas
+        self.nasals_mode = normalizer.nasals_mode
+        self.passes = []
+
+        table = None
+        for step in self._steps(normalizer):
+            is_char = step[0] not in ("re", "call") and len(step[0]) == 1
+            if not is_char and table is not None:
+                self._add_table(table)
+                table = None
+
+            if is_char:
+                table = self._compose(table or {}, *step)
+            elif step[0] == "re":
+                self._add_regex(*step[1:])
+            elif step[0] == "call":
+                self.passes.append(step[1])
+            else:
+                self._add_literal(*step)
+
+        if table is not None:
+            self._add_table(table)
+
+    def _steps(self, normalizer):
+        for step in _SCRIPT_STEPS[type(normalizer)]:
+            if step == "nasals":
+                if normalizer.nasals_mode != "do_nothing":
+                    yield ("call", normalizer.normalize_nasals)
+            elif step == "nukta":
+                if normalizer.remove_nuktas:
+                    yield (normalizer.NUKTA, "")
+            else:
+                yield step
+
+    @staticmethod
+    def _compose(table, char, repl):
+        """
+        Returns the table followed by the replacement of `char`
+        """
+        table = {c: img.replace(char, repl) for c, img in table.items()}
+        if char not in table:
+            table[char] = repl
+        return table
+
+    def _add_table(self, table):
+        table = {c: img for c, img in table.items() if img != c}
+        if not table:
+            return
+        chars = re.compile("[{}]".format("".join(map(re.escape, table))))
+
+        def apply(text):
+            return chars.sub(lambda m: table[m.group()], text)
+
+        self.passes.append(apply)
+
+    def _add_regex(self, pattern, repl, guard):
+        pattern = re.compile(pattern)
+
+        def apply(text):
+            return pattern.sub(repl, text) if guard in text else text
+
+        self.passes.append(apply)
+
+    def _add_literal(self, pattern, repl):
+        self.passes.append(lambda text: text.replace(pattern, repl))
+
+    def normalize(self, text):
+        for apply in self.passes:
+            text = apply(text)
+        return text
+
+    def __reduce__(self):
+        # the passes are closures, so the normalizer is rebuilt on unpickling
+        return (
+            _compiled_normalizer,
+            (self.lang, self.remove_nuktas, self.nasals_mode),
+        )
+
+
 class IndicNormalizerFactory(object):
     """
     Factory class to create language specific normalizers.
 
     """
 
-    def get_normalizer(self, language, remove_nuktas=False, nasals_mode="do_nothing"):
+    def get_normalizer(
+        self, language, remove_nuktas=False, nasals_mode="do_nothing", compiled=False
+    ):
         """
         Call the get_normalizer function to get the language specific
         normalizer
@@ -676,7 +905,12 @@ class IndicNormalizerFactory(object):
         Paramters:
         |language: language code
         |remove_nuktas: boolean, should the normalizer remove nukta characters
+        |compiled: boolean, return the equivalent `CompiledNormalizer`, which
+        |is built once per set of arguments and shared
         """
+        if compiled:
+            return _compiled_normalizer(language, remove_nuktas, nasals_mode)
+
         normalizer = None
         if language in ["hi", "mr", "sa", "kK", "ne", "sd"]:
             normalizer = DevanagariNormalizer(
@@ -744,3 +978,11 @@ class IndicNormalizerFactory(object):
             return True
         else:
             return False
+
+
+@lru_cache(maxsize=None)
+def _compiled_normalizer(language, remove_nuktas, nasals_mode):
+    normalizer = IndicNormalizerFactory().get_normalizer(
+        language, remove_nuktas, nasals_mode
+    )
+    return CompiledNormalizer(normalizer)
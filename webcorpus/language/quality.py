@@ -0,0 +1,50 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Quality checks shared by the processors
+
+The checks classify every character of the text once into a mask and then
+answer window queries on the mask with a single cumulative-sum pass, instead
+of re-summing the window at every offset.
+"""
+
+import numpy as np
+
+from . import script_mask
+
+
+def window_max(mask, win_sz):
+    """
+    Returns the largest sum of `mask` over the windows that `art_ok` has
+    always examined: runs of `win_sz - 1` consecutive entries, starting at
+    offsets `0 .. len(mask) - win_sz`. For `win_sz < 3`, every single entry
+    is a window.
+    """
+    n = len(mask)
+    csum = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(mask, out=csum[1:])
+    if win_sz < 3:
+        return int((csum[1:] - csum[:-1]).max())
+    return int((csum[win_sz - 1:n] - csum[:n - win_sz + 1]).max())
+
+
+def art_ok(text, script, win_sz=250, thres=200, min_ratio=None):
+    """
+    It performs the following tests on the text to determine if the text
+    represents a valid news article or not:
+    1. Has length greater than `win_sz`
+    2. If `min_ratio` is given, atleast that fraction of all the characters
+       are in the required script
+    3. Contains a continuous subtext of atleast length `win_sz` having
+       atleast `thres` characters in the required script
+    """
+    txt_sz = len(text)
+    if txt_sz < win_sz:
+        return False
+
+    mask = script_mask(text, script)
+
+    if min_ratio is not None and mask.sum() < min_ratio*txt_sz:
+        return False
+
+    return window_max(mask, win_sz) >= thres
@@ -0,0 +1,69 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Sentence segmentation of article bodies
+
+The processors that turn articles into sentences all go through
+`segment_batch`, which splits a batch of texts and checks the sentences of
+the whole batch at once.
+
+"""
+import numpy as np
+
+from . import code2script, script_mask
+from .sentence_tokenize import article_sentences
+
+
+# shorter sentences, or sentences with a smaller fraction of characters in
+# the script of the language, are dropped
+MIN_LEN = 10
+MIN_PURITY = 0.9
+
+
+def split_sentences(text, lang):
+    """
+    Sentences of an article body, split by punkt for English and by
+    `sentence_split` for the other languages, line by line
+    """
+    text = text.replace('\xa0', ' ')
+    text = text.replace('\\n', '\n')
+    if lang == 'en':
+        from nltk.tokenize import sent_tokenize
+        return sent_tokenize(text)
+    return list(article_sentences(text, lang))
+
+
+def keep_mask(sents, lang, min_len=MIN_LEN, min_purity=MIN_PURITY):
+    """
+    Returns a boolean array, set for the sentences of at least `min_len`
+    characters having at least `min_purity` of them in the script of the
+    language (digits of any script included)
+    """
+    if not sents:
+        return np.zeros(0, dtype=bool)
+    lens = np.fromiter(map(len, sents), dtype=np.int64, count=len(sents))
+    # one mask for all sentences; the separators are left out of the sums
+    mask = script_mask('\n'.join(sents), code2script(lang), digits=True)
+    csum = np.zeros(len(mask) + 1, dtype=np.int64)
+    np.cumsum(mask, out=csum[1:])
+    starts = np.cumsum(lens + 1) - lens - 1
+    in_script = csum[starts + lens] - csum[starts]
+    return (lens >= min_len) & (in_script >= min_purity * lens)
+
+
+def filter_sents(sents, lang):
+    keep = keep_mask(sents, lang)
+    return [sent for sent, ok in zip(sents, keep) if ok]
+
+
+def segment_batch(texts, lang, check=True):
+    """
+    Returns the list of sentences of every text. With `check` set, only
+    the sentences passing `keep_mask` are returned
+    """
+    segmented = [split_sentences(text, lang) for text in texts]
+    if not check:
+        return segmented
+    keep = iter(keep_mask([sent for sents in segmented for sent in sents],
+                          lang).tolist())
+    return [[sent for sent in sents if next(keep)] for sents in segmented]
@@ -4,160 +4,204 @@ Taken from https://github.com/anoopkunchukuttan/indic_nlp_library
 
 import re
 
+from functools import lru_cache
+
+from . import langinfo
 from . import unicode_transliterate
 
 DELIM_PAT = re.compile(r"[\.\?!\u0964\u0965]")
 
 
-def is_acronym_abbvr(text, lang):
-    ack_chars = {
-        ## acronym
-        "ए",
-        "ऎ",
-        "बी",
-        "बि",
-        "सी",
-        "सि",
-        "डी",
-        "डि",
-        "ई",
-        "इ",
-        "एफ",
-        "ऎफ",
-        "जी",
-        "जि",
-        "एच",
-        "ऎच",
-        "आई",
-        "आइ",
-        "ऐ",
-        "जे",
-        "जॆ",
-        "के",
-        "कॆ",
-        "एल",
-        "ऎल",
-        "एम",
-        "ऎम",
-        "एन",
-        "ऎन",
-        "ओ",
-        "ऒ",
-        "पी",
-        "पि",
-        "क्यू",
-        "क्यु",
-        "आर",
-        "एस",
-        "ऎस",
-        "टी",
-        "टि",
-        "यू",
-        "यु",
-        "वी",
-        "वि",
-        "व्ही",
-        "व्हि",
-        "डब्ल्यू",
-        "डब्ल्यु",
-        "एक्स",
-        "ऎक्स",
-        "वाय",
-        "जेड",
-        "ज़ेड",
-        # add halant to the previous English character mappings.
-        "एफ्",
-        "ऎफ्",
-        "एच्",
-        "ऎच्",
-        "एल्",
-        "ऎल्",
-        "एम्",
-        "ऎम्",
-        "एन्",
-        "ऎन्",
-        "आर्",
-        "एस्",
-        "ऎस्",
-        "एक्स्",
-        "ऎक्स्",
-        "वाय्",
-        "जेड्",
-        "ज़ेड्",
-        # abbreviation
-        "श्री",
-        "डॉ",
-        "कु",
-        "चि",
-        "सौ",
-    }
+# acronyms and abbreviations in Devanagari; words of other scripts are
+# compared in their transliteration to Devanagari
+ACRONYMS_ABBVRS = {
+    ## acronym
+    "ए",
+    "ऎ",
+    "बी",
+    "बि",
+    "सी",
+    "सि",
+    "डी",
+    "डि",
+    "ई",
+    "इ",
+    "एफ",
+    "ऎफ",
+    "जी",
+    "जि",
+    "एच",
+    "ऎच",
+    "आई",
+    "आइ",
+    "ऐ",
+    "जे",
+    "जॆ",
+    "के",
+    "कॆ",
+    "एल",
+    "ऎल",
+    "एम",
+    "ऎम",
+    "एन",
+    "ऎन",
+    "ओ",
+    "ऒ",
+    "पी",
+    "पि",
+    "क्यू",
+    "क्यु",
+    "आर",
+    "एस",
+    "ऎस",
+    "टी",
+    "टि",
+    "यू",
+    "यु",
+    "वी",
+    "वि",
+    "व्ही",
+    "व्हि",
+    "डब्ल्यू",
+    "डब्ल्यु",
+    "एक्स",
+    "ऎक्स",
+    "वाय",
+    "जेड",
+    "ज़ेड",
+    # add halant to the previous English character mappings.
+    "एफ्",
+    "ऎफ्",
+    "एच्",
+    "ऎच्",
+    "एल्",
+    "ऎल्",
+    "एम्",
+    "ऎम्",
+    "एन्",
+    "ऎन्",
+    "आर्",
+    "एस्",
+    "ऎस्",
+    "एक्स्",
+    "ऎक्स्",
+    "वाय्",
+    "जेड्",
+    "ज़ेड्",
+    # abbreviation
+    "श्री",
+    "डॉ",
+    "कु",
+    "चि",
+    "सौ",
+}
+
+DEVANAGARI_PAT = re.compile(r"[\u0900-\u097f]")
+
+
+@lru_cache(maxsize=None)
+def _native_acronyms(lang):
+    """
+    The acronyms and abbreviations written in the script of `lang`, or None
+    if the words of `lang` have to be transliterated to be looked up
+    """
+    if lang == "si":
+        # Sinhala is not transliterated by a mapping of code points
+        return None
+    if lang not in langinfo.SCRIPT_RANGES:
+        return ACRONYMS_ABBVRS
+    offset = langinfo.SCRIPT_RANGES[lang][0] - langinfo.SCRIPT_RANGES["hi"][0]
+    if offset == 0:
+        return ACRONYMS_ABBVRS
+    return frozenset(
+        "".join(chr(ord(c) + offset) for c in word) for word in ACRONYMS_ABBVRS
+    )
 
+
+def is_acronym_abbvr(text, lang):
+    native = _native_acronyms(lang)
+    if native is not None:
+        if text in native:
+            return True
+        if native is ACRONYMS_ABBVRS or not DEVANAGARI_PAT.search(text):
+            # the transliteration maps the script of `lang` one to one onto
+            # Devanagari, and leaves the other characters alone, so only
+            # words mixing in Devanagari can transliterate to an acronym
+            return False
     return (
         unicode_transliterate.UnicodeIndicTransliterator.transliterate(text, lang, "hi")
-        in ack_chars
+        in ACRONYMS_ABBVRS
     )
 
 
-def sentence_split(text, lang, delim_pat=DELIM_PAT):
-
+def iter_sentences(text, lang, delim_pat=DELIM_PAT):
+    """
+    Yields the sentences of a paragraph, as returned by `sentence_split`
+    """
     # Phase 1: break on sentence delimiters.
-    cand_sentences = []
-    begin = 0
-    text = text.strip()
-    for mo in delim_pat.finditer(text):
-        p1 = mo.start()
-
-        if p1 > 0 and text[p1 - 1].isnumeric():
-            continue
-
-        end = p1 + 1
-        s = text[begin:end].strip()
-        if len(s) > 0:
-            cand_sentences.append(s)
-        begin = p1 + 1
-
-    s = text[begin:].strip()
-    if len(s) > 0:
-        cand_sentences.append(s)
-
-    #     print(cand_sentences)
-    #     print('====')
-
-    #     return cand_sentences
-
     # Phase 2: Address the fact that '.' may not always be a sentence delimiter
     # Method: If there is a run of lines containing only a word (optionally)
     # and '.' merge these lines as well one sentence preceding and succeeding
     # this run of lines.
-    final_sentences = []
+    # Both phases are done in one pass over the candidate sentences.
     sen_buffer = ""
     bad_state = False
 
-    for i, sentence in enumerate(cand_sentences):
-        words = sentence.split(" ")
-        # if len(words)<=2 and words[-1]=='.':
-        if len(words) == 1 and sentence[-1] == ".":
+    for sentence in _candidates(text.strip(), delim_pat):
+        if sentence[-1] != ".":
+            is_abbvr = False
+        elif " " not in sentence:
             bad_state = True
             sen_buffer = sen_buffer + " " + sentence
-        # NEW condition
-        elif sentence[-1] == "." and is_acronym_abbvr(words[-1][:-1], lang):
+            continue
+        else:
+            is_abbvr = is_acronym_abbvr(
+                sentence[sentence.rfind(" ") + 1:-1], lang
+            )
+
+        if is_abbvr:
             if len(sen_buffer) > 0 and not bad_state:
-                final_sentences.append(sen_buffer)
+                yield sen_buffer
             bad_state = True
             sen_buffer = sentence
         elif bad_state:
-            sen_buffer = sen_buffer + " " + sentence
-            if len(sen_buffer) > 0:
-                final_sentences.append(sen_buffer)
+            yield sen_buffer + " " + sentence
             sen_buffer = ""
             bad_state = False
         else:  # good state
             if len(sen_buffer) > 0:
-                final_sentences.append(sen_buffer)
+                yield sen_buffer
             sen_buffer = sentence
-            bad_state = False
 
     if len(sen_buffer) > 0:
-        final_sentences.append(sen_buffer)
+        yield sen_buffer
+
+
+def _candidates(text, delim_pat):
+    begin = 0
+    for mo in delim_pat.finditer(text):
+        p1 = mo.start()
+
+        if p1 > 0 and text[p1 - 1].isnumeric():
+            continue
+
+        s = text[begin:p1 + 1].strip()
+        if len(s) > 0:
+            yield s
+        begin = p1 + 1
+
+    s = text[begin:].strip()
+    if len(s) > 0:
+        yield s
+
+
+def sentence_split(text, lang, delim_pat=DELIM_PAT):
+    return list(iter_sentences(text, lang, delim_pat))
+
 
-    return final_sentences
+def article_sentences(content, lang, delim_pat=DELIM_PAT):
+    """
+    Yields the sentences of every line (paragraph) of an article
+    """
+    for para in content.split("\n"):
+        yield from iter_sentences(para, lang, delim_pat)
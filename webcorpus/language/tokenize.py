@@ -21,6 +21,43 @@ triv_tokenizer_urdu_pat = re.compile(
 pat_num_seq = re.compile(r"([0-9]+ [,.:/] )+[0-9]+")
 
 
+# the same, in the untokenized text; fused into one pattern with the
+# punctuation runs (and the spaces around them) and the spacing to collapse
+_indic_num_seq = re.compile(r"[0-9]+(?:[ \t]*[,.:/][ \t]*[0-9]+)+")
+_num_seq_parts = re.compile(r"[0-9]+|[,.:/]")
+_punct_class = r"[" + string.punctuation + r"\u0964\u0965" + r"]"
+_indic_token_pat = re.compile(
+    r"(" + _indic_num_seq.pattern + r")"
+    + r"|[ \t]*(" + _punct_class + r"(?:[ \t]*" + _punct_class + r")*)[ \t]*"
+    + r"|[ \t]*\t[ \t]*|  +"
+)
+
+
+def _indic_token_repl(m):
+    num_seq, puncts = m.groups()
+    if num_seq is not None:
+        return num_seq.replace(" ", "").replace("\t", "")
+    if puncts is not None:
+        return " " + " ".join(puncts.replace(" ", "").replace("\t", "")) + " "
+    return " "
+
+
+def tokenize_indic(s):
+    """
+    `trivial_tokenize_indic`, returning the tokens joined by single spaces.
+    The punctuation is split off, the spaces collapsed and the numbers
+    joined up in a single scan of the text
+    """
+    lead = len(s) - len(s.lstrip(" \t"))
+    m = _indic_num_seq.match(s, lead)
+    if m is None:
+        return _indic_token_pat.sub(_indic_token_repl, s).strip(" ")
+    # a number at the very start has always been left tokenized
+    head = " ".join(_num_seq_parts.findall(m.group()))
+    tail = _indic_token_pat.sub(_indic_token_repl, s[m.end():])
+    return (head + tail).rstrip(" ")
+
+
 def trivial_tokenize_indic(s):
     """
     A trivial tokenizer which just tokenizes on the punctuation boundaries.
@@ -28,26 +65,7 @@ def trivial_tokenize_indic(s):
     purna virama and the deergha virama
     returns a list of tokens
     """
-    tok_str = triv_tokenizer_indic_pat.sub(r" \1 ", s.replace("\t", " "))
-    #     return re.sub(r'[ ]+',' ',tok_str).strip(' ').split(' ')
-
-    s = re.sub(r"[ ]+", " ", tok_str).strip(" ")
-
-    # do not tokenize numbers and dates
-    new_s = ""
-    prev = 0
-    for m in pat_num_seq.finditer(s):
-        start = m.start()
-        end = m.end()
-        if start > prev:
-            new_s = new_s + s[prev:start]
-            new_s = new_s + s[start:end].replace(" ", "")
-            prev = end
-
-    new_s = new_s + s[prev:]
-    s = new_s
-
-    return s.split(" ")
+    return tokenize_indic(s).split(" ")
 
 
 def trivial_tokenize_urdu(s):
@@ -70,3 +88,19 @@ def trivial_tokenize(s, lang="hi"):
         return trivial_tokenize_urdu(s)
     else:
         return trivial_tokenize_indic(s)
+
+
+def tokenize(s, lang="hi", as_list=False):
+    """
+    Returns the tokens of `trivial_tokenize` joined by single spaces, or
+    as a list if `as_list` is set
+    """
+    if lang == "ur":
+        tokens = trivial_tokenize_urdu(s)
+        return tokens if as_list else " ".join(tokens)
+    tok_str = tokenize_indic(s)
+    return tok_str.split(" ") if as_list else tok_str
+
+
+def tokenize_many(texts, lang="hi", as_list=False):
+    return [tokenize(s, lang, as_list) for s in texts]
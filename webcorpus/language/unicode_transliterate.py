@@ -2,6 +2,8 @@
 Taken from https://github.com/anoopkunchukuttan/indic_nlp_library
 """
 
+from functools import lru_cache
+
 from . import langinfo
 from . import itrans_transliterator
 from .sinhala_transliterator import (
@@ -44,6 +46,30 @@ class UnicodeIndicTransliterator(object):
 
         return offset
 
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _pair_table(lang1_code, lang2_code):
+        """
+        `str.translate` table from the script of lang1 to that of lang2,
+        with the Tamil exceptions applied
+        """
+        src = langinfo.SCRIPT_RANGES[lang1_code][0]
+        tgt = langinfo.SCRIPT_RANGES[lang2_code][0]
+        table = {}
+        for offset in range(
+            langinfo.COORDINATED_RANGE_START_INCLUSIVE,
+            langinfo.COORDINATED_RANGE_END_INCLUSIVE + 1,
+        ):
+            new_offset = offset
+            if lang2_code == "ta":
+                # tamil exceptions
+                new_offset = UnicodeIndicTransliterator._correct_tamil_mapping(
+                    offset
+                )
+            if src + offset != tgt + new_offset:
+                table[src + offset] = tgt + new_offset
+        return table
+
     @staticmethod
     def transliterate(text, lang1_code, lang2_code):
         """
@@ -70,30 +96,27 @@ class UnicodeIndicTransliterator(object):
                 lang2_code = "hi"
                 org_lang2_code = "si"
 
-            trans_lit_text = []
-            for c in text:
-                newc = c
-                offset = ord(c) - langinfo.SCRIPT_RANGES[lang1_code][0]
-                if (
-                    offset >= langinfo.COORDINATED_RANGE_START_INCLUSIVE
-                    and offset <= langinfo.COORDINATED_RANGE_END_INCLUSIVE
-                ):
-                    if lang2_code == "ta":
-                        # tamil exceptions
-                        offset = UnicodeIndicTransliterator\
-                            ._correct_tamil_mapping(offset)
-                    newc = chr(langinfo.SCRIPT_RANGES[lang2_code][0] + offset)
-
-                trans_lit_text.append(newc)
+            table = UnicodeIndicTransliterator._pair_table(lang1_code, lang2_code)
+            trans_lit_text = text.translate(table)
 
             # if Sinhala is source, do a mapping to Devanagari first
             if org_lang2_code == "si":
-                return sdt.devanagari_to_sinhala("".join(trans_lit_text))
+                return sdt.devanagari_to_sinhala(trans_lit_text)
 
-            return "".join(trans_lit_text)
+            return trans_lit_text
         else:
             return text
 
+    @staticmethod
+    def transliterate_many(texts, lang1_code, lang2_code):
+        """
+        transliterate() for a list of texts
+        """
+        return [
+            UnicodeIndicTransliterator.transliterate(text, lang1_code, lang2_code)
+            for text in texts
+        ]
+
 
 class ItransTransliterator(object):
     """
@@ -7,13 +7,13 @@ Create a sentence file from an article corpus
 import json
 import nltk
 
-from nltk.tokenize import sent_tokenize, word_tokenize
+from nltk.tokenize import word_tokenize
 from tqdm import tqdm
 from ..corpus.io import CatCorpus, SentCorpus
 from ..language.normalize import IndicNormalizerFactory
-from ..language.tokenize import trivial_tokenize
-from ..language.sentence_tokenize import sentence_split
-from ..language import code2script, in_script
+from ..language.tokenize import tokenize
+from ..language.segment import segment_batch, filter_sents
+from ..language import code2script
 
 
 # nltk.download('punkt')
@@ -27,7 +27,7 @@ class SentProcessor:
         self.input_corpus = SentCorpus(input_path)
         self.output_corpus = SentCorpus(output_path)
         normalizer_factory = IndicNormalizerFactory()
-        self.normalizer = normalizer_factory.get_normalizer(self.lang)
+        self.normalizer = normalizer_factory.get_normalizer(self.lang, compiled=True)
 
     def process_sent(self, sent):
         """
@@ -43,28 +43,12 @@ class SentProcessor:
         # num_masked = re.sub(r'[0-9]+', '#', normalized)
         # native_digits = SCRIPT_DIGITS[self.script]
         # num_masked = re.sub(r'[{}]+'.format(native_digits), '#', num_masked)
-        spaced = ' '.join(trivial_tokenize(normalized, self.lang))
+        spaced = tokenize(normalized, self.lang)
         return spaced
 
-    def check_sent(self, sent):
-        """
-        * Check sentences that contain one or more words not in the
-          desired language
-        * Check short sentences
-        """
-        if len(sent) < 10:
-            return False
-        cval = map(lambda c: in_script(c, self.script) or c.isdigit(), sent)
-        if sum(cval) >= 0.9*len(sent):
-            return True
-        return False
-
     def gen_dataset(self):
         for content in tqdm(self.input_corpus.sents()):
-            if self.lang == 'en':
-                sents = sent_tokenize(content)
-            else:
-                sents = sentence_split(content, self.lang)
+            sents = segment_batch([content], self.lang, check=False)[0]
             sents = [self.process_sent(sent) for sent in sents]
-            sents = [sent for sent in sents if self.check_sent(sent)]
+            sents = filter_sents(sents, self.lang)
             self.output_corpus.add_sents(sents)
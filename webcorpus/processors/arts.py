@@ -5,20 +5,45 @@ Create a article corpus from html corpus
 
 """
 import json
-import multiprocessing as mp
 
+from collections import Counter
 from tqdm import tqdm
-from ..corpus import NewsCorpus
-from ..language import code2script, in_script
+from ..corpus import ShardCorpus, get_news_corpus
+from ..language import code2script
+from ..language.quality import art_ok
+from .context import PageContext
+from .extractors import get_extractor
+from .manifest import Manifest, instance_key
+from .pool import imap_items
 
 
 class ArtsProcessor:
 
-    def __init__(self, lang, input_path, output_path):
+    def __init__(self, lang, input_path, output_path, backend=None,
+                 workers=None, extractor='boilerpipe', batch_size=32):
         self.lang = lang
         self.script = code2script(lang)
-        self.input_corpus = NewsCorpus(lang, input_path)
-        self.output_corpus = NewsCorpus(lang, output_path)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.extractor_name = extractor
+        self.extractor = None
+        self.input_corpus = get_news_corpus(lang, input_path)
+        self.output_corpus = get_news_corpus(lang, output_path, backend)
+        self.manifest = Manifest.for_run('arts', input_path, output_path)
+        self.checkpoint_every = 1000
+
+    def __getstate__(self):
+        # the pool workers only need the language settings; the articles
+        # are written to the output corpus by the parent process
+        state = self.__dict__.copy()
+        del state['input_corpus']
+        del state['output_corpus']
+        del state['manifest']
+        state['extractor'] = None
+        return state
+
+    def init_worker(self):
+        self.extractor = get_extractor(self.extractor_name)
 
     def art_ok(self, text, win_sz=250, thres=200):
         """
@@ -28,47 +53,70 @@ class ArtsProcessor:
         2. Contains a continuous subtext of atleast length `win_sz` having
            atleast `thres` characters in the required language
         """
-        txt_sz = len(text)
-        if txt_sz < win_sz:
-            return False
-
-        chr_valid = [in_script(c, self.script) for c in text]
-        subarr_sum = chr_valid.copy()
-        for cur_sz in range(2, win_sz):
-            subarr_sum = [
-                chr_valid[i] + subarr_sum[i + 1] for i in range(txt_sz - cur_sz)
-            ]
-        if max(subarr_sum) >= thres:
-            return True
+        return art_ok(text, self.script, win_sz, thres)
 
-        return False
-    
     def extract_article(self, html_page):
-        from boilerpipe.extract import Extractor
-        extractor = Extractor(extractor='ArticleExtractor',
-                              html=html_page['html'])
-        body = str(extractor.getText())
-        title = str(extractor.source.getTitle())
+        if self.extractor is None:
+            self.init_worker()
+        title, body = PageContext(html_page).extract(self.extractor)
         art = {
             'title': title,
             'body': body,
             'source': html_page['source'],
             'url': html_page['url'],
             'timestamp': html_page['timestamp']
-         }
-         return art
+        }
+        return art
 
     def process_item(self, html_page):
+        """
+        Returns a pair (outcome, article), where the article is None unless
+        the outcome is 'extracted'
+        """
         try:
-            art = self.extact_article(html_page)
-            if self.art_ok(art['body']):
-                self.output_corpus.add_instance(art)
-        except Exception as e:
-            pass
+            art = self.extract_article(html_page)
+        except Exception:
+            return 'extract_failed', None
+        if not self.art_ok(art['body']):
+            return 'rejected', None
+        return 'extracted', art
+
+    def checkpoint(self):
+        """
+        Records the pages done so far, once their articles are flushed
+        """
+        self.output_corpus.flush()
+        if isinstance(self.output_corpus, ShardCorpus):
+            self.manifest.commit(self.output_corpus.index_size)
+        else:
+            self.manifest.commit()
 
     def run(self):
-        proc_pool = mp.Pool(mp.cpu_count())
-        for _ in tqdm(proc_pool.imap_unordered(self.process_item, self.input_corpus.all_instances(), 32)):
-            pass
-        proc_pool.terminate()
-        proc_pool.join()
+        """
+        Returns the number of pages per outcome: 'extracted', 'rejected' by
+        `art_ok`, 'extract_failed', 'decode_failed' (unreadable pages of
+        the input corpus) and 'skipped' (pages done by an earlier run)
+        """
+        counts = Counter()
+        if isinstance(self.output_corpus, ShardCorpus):
+            # a shard corpus writes its blocks as they fill up, so blocks
+            # written after the last checkpoint of a crashed run are dropped
+            self.manifest.truncate(self.output_corpus.index_path,
+                                   self.output_corpus.truncate)
+        pages = self.manifest.todo(self.input_corpus.all_instances())
+        pbar = tqdm(imap_items(self, pages, self.workers, self.batch_size,
+                               key=instance_key))
+        for (key, version), (outcome, art) in pbar:
+            counts[outcome] += 1
+            if art:
+                self.output_corpus.add_instance(art)
+            self.manifest.done(key, version)
+            if len(self.manifest.pending) >= self.checkpoint_every:
+                self.checkpoint()
+                pbar.set_postfix(counts)
+        self.checkpoint()
+        counts['skipped'] = self.manifest.skipped
+        counts['decode_failed'] = getattr(self.input_corpus, 'decode_errors', 0)
+        print('Processed {} pages: {}'.format(sum(counts.values()),
+                                              dict(counts)))
+        return counts
@@ -7,10 +7,9 @@ import json
 import string
 import regex
 
-from nltk.tokenize import sent_tokenize, word_tokenize
 from tqdm import tqdm
-from ..corpus import FileCorpus, NewsCorpus
-from ..language.sentence_tokenize import sentence_split
+from ..corpus import FileCorpus, get_news_corpus
+from ..language.segment import segment_batch
 from ..language import code2script, in_script
 
 
@@ -19,7 +18,7 @@ class ArtsProcessor:
     def __init__(self, lang, input_path, output_path, meta_file):
         self.lang = lang
         self.script = code2script(lang)
-        self.input_corpus = NewsCorpus(lang, input_path)
+        self.input_corpus = get_news_corpus(lang, input_path)
         self.arts_file = FileCorpus(lang, output_path)
         self.meta_file = FileCorpus(lang, meta_file)
 
@@ -68,12 +67,7 @@ class ArtsProcessor:
             if len(content) < 128:
                 continue
 
-            sents = []
-            if self.lang == 'en':
-                sents = sent_tokenize(content)
-            else:
-                for para in content.split('\n'):
-                    sents += sentence_split(para, self.lang)
+            sents = segment_batch([content], self.lang, check=False)[0]
 
             self.meta_file.add_instance(article['url'])
             for sent in sents:
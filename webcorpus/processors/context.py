@@ -0,0 +1,70 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Processing context of a single html page
+
+The page is parsed into an lxml tree at most once, and the same tree is then
+handed to the date extractor, the cleaner and the article extractor. A context
+lives only as long as the processing of its page.
+
+"""
+from functools import lru_cache
+
+from .extractors import parse_html
+
+
+@lru_cache(maxsize=None)
+def get_cleaner():
+    """
+    The cleaner used on crawled pages before their article is extracted.
+    The spiders store the pages uncleaned
+    """
+    from lxml.html.clean import Cleaner
+    return Cleaner(scripts=True, javascript=True, style=True,
+                   comments=True, links=False, meta=False,
+                   page_structure=False, embedded=True,
+                   frames=True, forms=False, annoying_tags=False)
+
+
+class PageContext:
+
+    def __init__(self, html_page):
+        self.page = html_page
+        self._tree = None
+        self._cleaned = False
+        self._publish_date = False
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = parse_html(self.page['html'])
+        return self._tree
+
+    def publish_date(self):
+        """
+        Publish date of the page as 'YYYY-MM-DD', or None if it can not be
+        found. It looks at the page as crawled, so it must come before
+        `clean`, which drops the scripts that often carry the date
+        """
+        if self._publish_date is False:
+            from htmldate import find_date
+            try:
+                self._publish_date = find_date(self.tree)
+            except Exception:
+                self._publish_date = None
+        return self._publish_date
+
+    def clean(self):
+        """
+        Cleans the tree in place
+        """
+        if not self._cleaned:
+            get_cleaner()(self.tree)
+            self._cleaned = True
+        return self.tree
+
+    def extract(self, extractor):
+        """
+        Returns the title and body of the article in the cleaned page
+        """
+        return extractor.extract_tree(self.clean())
@@ -6,16 +6,19 @@ Create a article corpus from html corpus
 """
 import json
 import os
-import multiprocessing as mp
 
+from collections import Counter
 from tqdm import tqdm
 from hashlib import sha1
-from htmldate.cli import examine
 from datetime import datetime
-from ..corpus import DirCorpus, NewsCorpus
-from ..language import code2script, in_script
-from ..language.sentence_tokenize import sentence_split
-from nltk.tokenize import sent_tokenize, word_tokenize
+from ..corpus import DirCorpus, ShardCorpus, get_news_corpus
+from ..language import code2script
+from ..language.quality import art_ok
+from ..language.segment import segment_batch
+from .context import PageContext
+from .extractors import get_extractor
+from .manifest import Manifest, instance_key
+from .pool import imap_items
 
 
 class DatedCorpus(DirCorpus):
@@ -29,92 +32,122 @@ class DatedCorpus(DirCorpus):
 
 class DatedProcessor:
 
-    def __init__(self, lang, input_path, output_path):
+    def __init__(self, lang, input_path, output_path, backend=None,
+                 workers=None, extractor='boilerpipe', batch_size=32):
         self.lang = lang
         self.script = code2script(lang)
-        self.input_corpus = NewsCorpus(lang, input_path)
-        self.output_corpus = DatedCorpus(lang, output_path)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.extractor_name = extractor
+        self.extractor = None
+        self.input_corpus = get_news_corpus(lang, input_path)
+        if backend == 'shard':
+            self.output_corpus = ShardCorpus(lang, output_path)
+        else:
+            self.output_corpus = DatedCorpus(lang, output_path)
+        self.manifest = Manifest.for_run('dated', input_path, output_path)
+        self.checkpoint_every = 1000
+
+    def __getstate__(self):
+        # the pool workers only need the language settings; the articles
+        # are written to the output corpus by the parent process
+        state = self.__dict__.copy()
+        del state['input_corpus']
+        del state['output_corpus']
+        del state['manifest']
+        state['extractor'] = None
+        return state
+
+    def init_worker(self):
+        self.extractor = get_extractor(self.extractor_name)
 
     def art_ok(self, text, win_sz=250, thres=200):
         """
-        It performs two tests on the text to determine if the text represents
-        a valid news article or not:
+        It performs three tests on the text to determine if the text
+        represents a valid news article or not:
         1. Has length greater than `win_sz`
-        2. Contains a continuous subtext of atleast length `win_sz` having
+        2. Atleast 70% of the characters are in the required language
+        3. Contains a continuous subtext of atleast length `win_sz` having
            atleast `thres` characters in the required language
         """
-        txt_sz = len(text)
-        if txt_sz < win_sz:
-            return False
+        return art_ok(text, self.script, win_sz, thres, min_ratio=0.7)
 
-        chr_valid = [in_script(c, self.script) for c in text]
-
-        if sum(chr_valid) < 0.7*txt_sz:
-            return False
-
-        subarr_sum = chr_valid.copy()
-        for cur_sz in range(2, win_sz):
-            subarr_sum = [
-                chr_valid[i] + subarr_sum[i + 1] for i in range(txt_sz - cur_sz)
-            ]
-        if max(subarr_sum) >= thres:
-            return True
-
-        return False
-
-    def check_sent(self, sent):
+    def process_item(self, html_page):
         """
-        * Check sentences that contain one or more words not in the
-          desired language
-        * Check short sentences
+        Returns a pair (outcome, article), where the article is None unless
+        the outcome is 'extracted'
         """
-        if len(sent) < 10:
-            return False
-        cval = map(lambda c: in_script(c, self.script) or c.isdigit(), sent)
-        if sum(cval) >= 0.9*len(sent):
-            return True
-        return False
-
+        page = PageContext(html_page)
+        publish_date = page.publish_date()
+        if not publish_date:
+            return 'undated', None
 
-    def process_item(self, html_page):
+        if self.extractor is None:
+            self.init_worker()
         try:
-            publish_date = examine(html_page['html'])
-            from boilerpipe.extract import Extractor
-            extractor = Extractor(extractor='ArticleExtractor',
-                                  html=html_page['html'])
-            body = str(extractor.getText())
-            title = str(extractor.source.getTitle())
-            art = {
-                'title': title,
-                'body': body,
-                'lang': self.lang,
-                'source': html_page['source'],
-                'url': html_page['url'],
-                'crawl_date': html_page['timestamp'],
-                'publish_date': publish_date,
-                'article_id': sha1(html_page['url'].encode('utf-8')).hexdigest(),
-                'sentences': []
-            }
-            if self.art_ok(art['body']):
-                content = art['body']
-                content = content.replace(u'\xa0', u' ')
-                content = content.replace('\\n', '\n')
-                sents = []
-                if self.lang == 'en':
-                    sents = sent_tokenize(content)
-                else:
-                    for para in content.split('\n'):
-                        sents += sentence_split(para, self.lang)
-                    sents = [sent for sent in sents if self.check_sent(sent)]
-                art['sentences'] = sents
-                if len(sents) >= 3:
-                    self.output_corpus.add_instance(art)
-        except Exception as e:
-            pass
+            title, body = page.extract(self.extractor)
+        except Exception:
+            return 'extract_failed', None
+
+        art = {
+            'title': title,
+            'body': body,
+            'lang': self.lang,
+            'source': html_page['source'],
+            'url': html_page['url'],
+            'crawl_date': html_page['timestamp'],
+            'publish_date': publish_date,
+            'article_id': sha1(html_page['url'].encode('utf-8')).hexdigest(),
+            'sentences': []
+        }
+        if not self.art_ok(art['body']):
+            return 'rejected', None
+
+        # English sentences have never been checked for their script
+        sents = segment_batch([art['body']], self.lang,
+                              check=self.lang != 'en')[0]
+        art['sentences'] = sents
+        if len(sents) < 3:
+            return 'too_few_sents', None
+        return 'extracted', art
+
+    def checkpoint(self):
+        """
+        Records the pages done so far, once their articles are flushed
+        """
+        self.output_corpus.flush()
+        if isinstance(self.output_corpus, ShardCorpus):
+            self.manifest.commit(self.output_corpus.index_size)
+        else:
+            self.manifest.commit()
 
     def run(self):
-        proc_pool = mp.Pool(mp.cpu_count())
-        for _ in tqdm(proc_pool.imap_unordered(self.process_item, self.input_corpus.all_instances(), 32)):
-            pass
-        proc_pool.terminate()
-        proc_pool.join()
+        """
+        Returns the number of pages per outcome: 'extracted', 'undated',
+        'extract_failed', 'rejected' by `art_ok`, 'too_few_sents',
+        'decode_failed' (unreadable pages of the input corpus) and 'skipped'
+        (pages done by an earlier run)
+        """
+        counts = Counter()
+        if isinstance(self.output_corpus, ShardCorpus):
+            # a shard corpus writes its blocks as they fill up, so blocks
+            # written after the last checkpoint of a crashed run are dropped
+            self.manifest.truncate(self.output_corpus.index_path,
+                                   self.output_corpus.truncate)
+        pages = self.manifest.todo(self.input_corpus.all_instances())
+        pbar = tqdm(imap_items(self, pages, self.workers, self.batch_size,
+                               key=instance_key))
+        for (key, version), (outcome, art) in pbar:
+            counts[outcome] += 1
+            if art:
+                self.output_corpus.add_instance(art)
+            self.manifest.done(key, version)
+            if len(self.manifest.pending) >= self.checkpoint_every:
+                self.checkpoint()
+                pbar.set_postfix(counts)
+        self.checkpoint()
+        counts['skipped'] = self.manifest.skipped
+        counts['decode_failed'] = getattr(self.input_corpus, 'decode_errors', 0)
+        print('Processed {} pages: {}'.format(sum(counts.values()),
+                                              dict(counts)))
+        return counts
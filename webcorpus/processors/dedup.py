@@ -0,0 +1,159 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Remove duplicate sentences across sentence files
+
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unicodedata
+import numpy as np
+
+from functools import lru_cache
+from hashlib import blake2b
+from itertools import islice
+from tqdm import tqdm
+from ..corpus import FileCorpus
+
+
+# (hash, line number) pairs, as written to the bucket files
+RECORD = np.dtype([('hash', '<u8'), ('seq', '<u8')])
+
+
+@lru_cache(maxsize=None)
+def _strip_table():
+    """
+    Deletes whitespace, digits and punctuation when passed to `str.translate`
+    """
+    table = {}
+    for cp in range(sys.maxunicode + 1):
+        c = chr(cp)
+        if unicodedata.category(c)[0] in 'ZNP' or c.isspace():
+            table[cp] = None
+    return table
+
+
+def normalized_key(line):
+    return line.translate(_strip_table())
+
+
+class DedupProcessor:
+    """
+    Writes the lines of the input files to the output file, leaving out the
+    lines seen before, in the input files or earlier in the same file
+
+    Lines are compared by a 64-bit hash of their content. With `normalize`
+    set, the hash is taken of the line without its whitespace, digits and
+    punctuation, so lines differing only in those are duplicates too.
+
+    It needs memory for one bit per input line, plus one of `buckets`
+    partitions of the hashes at a time:
+    1. The hashes are computed in chunks of `chunk_size` lines and spread
+       over bucket files in `tmp_dir`, along with their line numbers
+    2. Every bucket is sorted, and the first line of every hash is marked
+       in a bitmap of the lines to keep
+    3. The inputs are read again, and the marked lines are written out
+    """
+
+    def __init__(self, lang, input_paths, output_path, normalize=False,
+                 buckets=256, chunk_size=1 << 20, tmp_dir=None):
+        self.lang = lang
+        self.input_paths = input_paths
+        self.output_path = output_path
+        self.normalize = normalize
+        self.buckets = buckets
+        self.chunk_size = chunk_size
+        self.tmp_dir = tmp_dir or os.path.dirname(os.path.abspath(output_path))
+
+    def lines(self):
+        for path in self.input_paths:
+            yield from FileCorpus(self.lang, path).all_instances()
+
+    def hash_chunk(self, lines):
+        if self.normalize:
+            lines = map(normalized_key, lines)
+        digests = b''.join(blake2b(line.encode('utf-8'), digest_size=8)
+                           .digest() for line in lines)
+        return np.frombuffer(digests, dtype='<u8')
+
+    def partition(self, bucket_dir):
+        """
+        Writes the (hash, line number) records to the bucket files and
+        returns the number of lines
+        """
+        fps = [open(os.path.join(bucket_dir, str(b)), 'wb')
+               for b in range(self.buckets)]
+        lines = iter(self.lines())
+        nlines = 0
+        with tqdm(desc='hashing', unit=' lines') as pbar:
+            while True:
+                hashes = self.hash_chunk(islice(lines, self.chunk_size))
+                if len(hashes) == 0:
+                    break
+                records = np.empty(len(hashes), dtype=RECORD)
+                records['hash'] = hashes
+                records['seq'] = np.arange(nlines, nlines + len(hashes))
+                bucket = hashes % self.buckets
+                order = np.argsort(bucket, kind='stable')
+                records = records[order]
+                bounds = np.searchsorted(bucket[order],
+                                         np.arange(self.buckets + 1))
+                for b in range(self.buckets):
+                    records[bounds[b]:bounds[b + 1]].tofile(fps[b])
+                nlines += len(hashes)
+                pbar.update(len(hashes))
+        for fp in fps:
+            fp.close()
+        return nlines
+
+    def mark_first(self, bucket_dir, nlines):
+        """
+        Returns a bitmap of the lines whose hash did not occur before them
+        """
+        keep = np.zeros((nlines + 7) // 8, dtype=np.uint8)
+        for b in tqdm(range(self.buckets), desc='sorting'):
+            records = np.fromfile(os.path.join(bucket_dir, str(b)),
+                                  dtype=RECORD)
+            if len(records) == 0:
+                continue
+            # records of a hash are in line order, as they were appended so
+            records = records[np.argsort(records['hash'], kind='stable')]
+            hashes = records['hash']
+            first = np.ones(len(records), dtype=bool)
+            first[1:] = hashes[1:] != hashes[:-1]
+            seqs = records['seq'][first]
+            bits = np.left_shift(np.uint8(1), (seqs & 7).astype(np.uint8))
+            np.bitwise_or.at(keep, seqs >> 3, bits)
+        return keep
+
+    def run(self):
+        """
+        Returns the number of input lines and of the unique lines written
+        """
+        bucket_dir = tempfile.mkdtemp(prefix='dedup-', dir=self.tmp_dir)
+        try:
+            nlines = self.partition(bucket_dir)
+            keep = self.mark_first(bucket_dir, nlines)
+        finally:
+            shutil.rmtree(bucket_dir)
+
+        lines = iter(self.lines())
+        start = nunique = 0
+        with open(self.output_path, 'w', encoding='utf-8') as out, \
+                tqdm(total=nlines, desc='writing', unit=' lines') as pbar:
+            while True:
+                chunk = list(islice(lines, self.chunk_size))
+                if not chunk:
+                    break
+                lo, hi = start >> 3, (start + len(chunk) + 7) >> 3
+                bits = np.unpackbits(keep[lo:hi], bitorder='little')
+                bits = bits[start - 8*lo:start - 8*lo + len(chunk)]
+                kept = [line for line, bit in zip(chunk, bits) if bit]
+                out.write(''.join(line + '\n' for line in kept))
+                nunique += len(kept)
+                start += len(chunk)
+                pbar.update(len(chunk))
+        print('Kept {} of {} lines'.format(nunique, nlines))
+        return nlines, nunique
@@ -0,0 +1,138 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Article extraction backends
+
+A backend turns the html of a page into its title and body text. Backends
+are meant to be created once per worker process and reused for all the
+pages the worker sees.
+
+"""
+from collections import defaultdict
+
+
+def parse_html(html):
+    """
+    Parses an html page into an lxml tree
+    """
+    import lxml.html
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses unicode strings that carry an xml encoding declaration
+        return lxml.html.document_fromstring(html.encode('utf-8'))
+
+
+def serialize_html(tree):
+    import lxml.html
+    return lxml.html.tostring(tree, encoding='unicode')
+
+
+class BoilerpipeExtractor:
+    """
+    Boilerpipe's ArticleExtractor, running in the JVM
+    """
+
+    def __init__(self):
+        from boilerpipe.extract import Extractor
+        self.Extractor = Extractor
+
+    def extract(self, html):
+        extractor = self.Extractor(extractor='ArticleExtractor', html=html)
+        body = str(extractor.getText())
+        title = str(extractor.source.getTitle())
+        return title, body
+
+    def extract_tree(self, tree):
+        # boilerpipe parses on its own, in the JVM
+        return self.extract(serialize_html(tree))
+
+
+class LxmlExtractor:
+    """
+    A pure python extractor that needs no JVM
+
+    It is a text density heuristic: blocks of text that are long enough and
+    are not mostly links vote for their parent elements, and the body is
+    made of the blocks inside the element that gets the most votes.
+    """
+
+    SKIP_TAGS = {'script', 'style', 'noscript', 'nav', 'header', 'footer',
+                 'aside', 'form', 'iframe', 'button', 'select', 'template',
+                 'head'}
+    BLOCK_TAGS = {'p', 'div', 'pre', 'blockquote', 'li', 'td', 'dd', 'ul',
+                  'ol', 'table', 'tr', 'section', 'article', 'main', 'h1',
+                  'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'figure', 'body'}
+
+    def __init__(self, min_len=25, max_link_density=0.33):
+        self.min_len = min_len
+        self.max_link_density = max_link_density
+
+    def _own_text(self, elem):
+        """
+        Text of `elem`, leaving out the text of nested blocks. Returns the
+        text and the length of the part of it within links
+        """
+        parts = [elem.text or '']
+        link_len = 0
+        for child in elem:
+            if not isinstance(child.tag, str):
+                pass
+            elif child.tag in self.SKIP_TAGS:
+                pass
+            elif child.tag not in self.BLOCK_TAGS:
+                txt = child.text_content()
+                parts.append(txt)
+                if child.tag == 'a':
+                    link_len += len(txt)
+            parts.append(child.tail or '')
+        return ' '.join(''.join(parts).split()), link_len
+
+    def _blocks(self, tree):
+        skipped = set()
+        for elem in tree.iter():
+            if not isinstance(elem.tag, str):
+                continue
+            parent = elem.getparent()
+            if elem.tag in self.SKIP_TAGS or parent in skipped:
+                skipped.add(elem)
+                continue
+            if elem.tag not in self.BLOCK_TAGS:
+                continue
+            txt, link_len = self._own_text(elem)
+            if len(txt) < self.min_len:
+                continue
+            if link_len > self.max_link_density * len(txt):
+                continue
+            yield elem, txt
+
+    def extract_tree(self, tree):
+        title = (tree.findtext('.//title') or '').strip()
+
+        blocks = list(self._blocks(tree))
+        scores = defaultdict(float)
+        for elem, txt in blocks:
+            parent = elem.getparent()
+            if parent is not None:
+                scores[parent] += len(txt)
+                grandparent = parent.getparent()
+                if grandparent is not None:
+                    scores[grandparent] += len(txt) / 2
+        if not scores:
+            return title, ''
+
+        best = max(scores, key=scores.get)
+        inside = set(best.iter())
+        body = '\n'.join(txt for elem, txt in blocks if elem in inside)
+        return title, body
+
+    def extract(self, html):
+        return self.extract_tree(parse_html(html))
+
+
+def get_extractor(name):
+    if name == 'boilerpipe':
+        return BoilerpipeExtractor()
+    elif name == 'lxml':
+        return LxmlExtractor()
+    raise ValueError('Unknown extractor: {}'.format(name))
@@ -12,131 +12,187 @@ import sys
 import copy
 import regex
 import random
+import requests
+import sqlite3
+import tempfile
 import unicodedata as ud
+import numpy as np
 
-from threading import Thread
-from requests import get
-from time import sleep
-from functools import reduce
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from itertools import filterfalse
 from tqdm import tqdm
-from urllib.parse import quote
 from ..corpus import NewsCorpus
 from ..language.normalize import IndicNormalizerFactory
 from ..language.tokenize import trivial_tokenize
 from ..language.sentence_tokenize import sentence_split
 from ..language import code2script, in_script
-from datasketch import MinHash, MinHashLSH
+from datasketch import MinHash
 
 
-class URLThread(Thread):
-    def __init__(self, url):
-        super(URLThread, self).__init__()
-        self.url = url
-        self.response = None
+class EntityCache:
+    """
+    A persistent map from words to whether they are entities, stored in an
+    sqlite database
 
-    def run(self):
-        self.response = get(self.url)
+    Reads are served from memory. Additions are written behind, in batches
+    of `commit_every`, and on `flush`.
+    """
 
+    def __init__(self, path, commit_every=1000):
+        self.commit_every = commit_every
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS words (word TEXT PRIMARY '
+                          'KEY, is_entity INTEGER) WITHOUT ROWID')
+        self.words = dict(self.conn.execute('SELECT word, is_entity FROM words'))
+        self.pending = {}
 
-def multi_get(uris, timeout=2.0):
-    def alive_count(lst):
-        alive = map(lambda x: 1 if x.isAlive() else 0, lst)
-        return reduce(lambda a,b: a+b, alive, 0)
-    threads = [URLThread(uri) for uri in uris]
-    for thread in threads:
-        thread.start()
-    while alive_count(threads) > 0 and timeout > 0.0:
-        timeout = timeout - 0.01
-        sleep(0.01)
-    return [(x.url, x.response) for x in threads]
+    def __contains__(self, word):
+        return word in self.words
 
+    def __getitem__(self, word):
+        return self.words[word]
 
-class WikiEntities:
+    def __setitem__(self, word, is_entity):
+        self.words[word] = is_entity
+        self.pending[word] = is_entity
+        if len(self.pending) >= self.commit_every:
+            self.flush()
 
-    def __init__(self, lang):
-        # Load cache
-        self.cache_fname = '{}-words.json'.format(lang)
-        if os.path.exists(self.cache_fname):
-            with open(self.cache_fname) as fp:
-                self.cache = json.load(fp)
-        else:
-            self.cache = {'words': {}}
-
-        self.URL = 'https://www.wikidata.org/w/api.php?action=wbsearchentities'\
-                          '&search={}&language={}&format=json'
-        self.num_http_calls = 0
-        self.last_sync = 0
-        self.cache_hits = 0
-        self.lang = lang
+    def flush(self):
+        self.conn.executemany('INSERT OR REPLACE INTO words (word, is_entity) '
+                              'VALUES (?, ?)', self.pending.items())
+        self.conn.commit()
+        self.pending = {}
+
+
+class WikidataBackend:
+    """
+    Looks words up with the wbsearchentities API of Wikidata
 
-    def _is_entity(self, response, word):
+    The API takes a single search per request, so a batch of words is
+    looked up by `max_workers` concurrent requests over a shared pool of
+    keep-alive connections.
+    """
+
+    URL = 'https://www.wikidata.org/w/api.php'
+
+    def __init__(self, lang, max_workers=16, timeout=5.0):
+        self.lang = lang
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers)
+
+    def _is_entity(self, word):
+        params = {'action': 'wbsearchentities', 'search': word,
+                  'language': self.lang, 'format': 'json'}
         try:
+            response = self.session.get(self.URL, params=params,
+                                        timeout=self.timeout)
             result = response.json()
-            matches = [item['match']['text'] for item in result['search']]
-            if word in matches:
-                return True
-            return False
-        except:
-            return False
+        except Exception:
+            # not known; left out of the cache, to be retried later
+            return None
+        matches = [item['match']['text'] for item in result.get('search', [])]
+        return word in matches
+
+    def lookup(self, words):
+        """
+        Returns a dict from each word to whether it is an entity, or None
+        if the lookup failed
+        """
+        return dict(zip(words, self.executor.map(self._is_entity, words)))
+
+
+class DictionaryBackend:
+    """
+    Looks words up in a local file of entities, one per line, e.g. to run
+    offline or to benchmark without the network
+    """
+
+    def __init__(self, path):
+        with open(path, encoding='utf-8') as fp:
+            self.entities = set(line.strip() for line in fp)
+
+    def lookup(self, words):
+        return {word: word in self.entities for word in words}
+
+
+class WikiEntities:
+
+    def __init__(self, lang, backend=None, cache_path=None):
+        self.lang = lang
+        self.backend = backend or WikidataBackend(lang)
+        self.cache = EntityCache(cache_path or '{}-words.db'.format(lang))
+        self.num_http_calls = 0
+        self.cache_hits = 0
 
     def extract_entities(self, words):
         entities = set()
-        url2word = {}
+        missing = set()
         for word in words:
-            if word in self.cache['words']:
+            if word in self.cache:
                 self.cache_hits += 1
-                if self.cache['words'][word]:
+                if self.cache[word]:
                     entities.add(word)
-            elif word not in self.cache and len(word) > 2:
-                url2word[self.URL.format(quote(word), self.lang)] = word
+            elif len(word) > 2:
+                missing.add(word)
 
-        self.num_http_calls += len(url2word)
-        ret = multi_get(url2word.keys())
-
-        for url, response in ret:
-            word = url2word[url]
-            is_ent = self._is_entity(response, word)
-            self.cache['words'][word] = is_ent
+        self.num_http_calls += len(missing)
+        for word, is_ent in self.backend.lookup(list(missing)).items():
+            if is_ent is None:
+                continue
+            self.cache[word] = is_ent
             if is_ent:
                 entities.add(word)
 
-        if self.num_http_calls - self.last_sync > 1000:
-            with open(self.cache_fname, 'w') as fp:
-                json.dump(self.cache, fp, ensure_ascii=False, indent=4)
-            self.last_sync = self.num_http_calls
-
         return entities
 
 
 class ArticlesDatabase:
-    
-    def __init__(self, lang):
+    """
+    Articles and the MinHash signatures of their entity sets
+
+    The articles are appended to a file on disk, and only their offsets are
+    kept in memory, along with a matrix of signatures. Once all articles
+    are added, `query_similar` finds candidates with banded LSH over the
+    signatures: a sorted array of band hashes per band, searched with
+    numpy.
+    """
+
+    NUM_PERM = 128
+    # as picked by datasketch's MinHashLSH for a threshold of 0.5
+    BANDS, ROWS = 25, 5
+
+    def __init__(self, lang, entity_backend=None, path=None, cache_path=None):
         self.lang = lang
-        self.wikient = WikiEntities(self.lang)
+        self.wikient = WikiEntities(self.lang, entity_backend, cache_path)
         normalizer_factory = IndicNormalizerFactory()
-        self.normalizer = normalizer_factory.get_normalizer(self.lang)
-        self.articles = []
-        self.ent_sets = []
-        self.minhashes = []
-        self.lsh = MinHashLSH(threshold=0.5, num_perm=128)
+        self.normalizer = normalizer_factory.get_normalizer(self.lang, compiled=True)
+        self.tmp_dir = tempfile.TemporaryDirectory() if path is None else None
+        self.path = path or os.path.join(self.tmp_dir.name, 'articles')
+        self.fp = open(self.path, 'w+b')
+        self.offsets = array('q', [0])
+        self.sigs = np.empty((1024, self.NUM_PERM), dtype=np.uint64)
+        self.empty = array('b')
+        self.bands = None
 
     def __getitem__(self, key):
-        return self.articles[key]
+        self.fp.flush()
+        start, end = self.offsets[key], self.offsets[key + 1]
+        data = os.pread(self.fp.fileno(), end - start, start)
+        return json.loads(data.decode('utf-8'))
 
     def __len__(self):
-        return len(self.articles)
+        return len(self.offsets) - 1
 
     def __iter__(self):
-        self.it_idx = 0
-        return self
-
-    def __next__(self):
-        self.it_idx += 1
-        if self.it_idx > len(self.articles):
-            raise StopIteration
-        return self.articles[self.it_idx-1]
-    
+        for idx in range(len(self)):
+            yield self[idx]
+
     def extract_words(self, txt):
         sents = sentence_split(txt, self.lang)
         words = []
@@ -147,75 +203,122 @@ class ArticlesDatabase:
         return words
 
     def add(self, article):
-        index = len(self.articles)
-        minhash = self.compute_hash(article)
+        index = len(self)
+        minhash, eset = self.compute_hash(article)
 
         if (index+1) % 1000 == 0:
             print('Processed {} articles. Wikidata API calls: {}, Cache hits: {}'\
                   .format(index + 1, self.wikient.num_http_calls, self.wikient.cache_hits))
 
-        self.articles.append(article)
-        self.minhashes.append(minhash)
-
-        self.lsh.insert(index, minhash)
-
-    def count(self):
-        return len(self.titles)
+        data = json.dumps(article, ensure_ascii=False).encode('utf-8')
+        self.fp.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+        if index == len(self.sigs):
+            self.sigs = np.resize(self.sigs, (2 * len(self.sigs),
+                                              self.NUM_PERM))
+        self.sigs[index] = minhash.hashvalues
+        self.empty.append(not eset)
+        self.bands = None
 
     def compute_hash(self, article):
         words = self.extract_words(article['title'] + ' ' + article['body'])
         eset = self.wikient.extract_entities(words)
-        minhash = MinHash(num_perm=128)
+        minhash = MinHash(num_perm=self.NUM_PERM)
         for elm in eset:
             minhash.update(elm.encode('utf-8'))
-        return minhash
+        return minhash, eset
 
-    def query_similar(self, art, nmax=3):
+    def band_hashes(self, sigs):
+        rows = sigs[:, :self.BANDS * self.ROWS]
+        rows = rows.reshape(len(sigs), self.BANDS, self.ROWS)
+        # a hash of the rows of each band; wraps around on overflow
+        mult = np.arange(1, 2 * self.ROWS, 2, dtype=np.uint64) * \
+            np.uint64(0x9e3779b97f4a7c15)
+        return (rows * mult).sum(axis=2, dtype=np.uint64)
+
+    def build_bands(self):
+        """
+        Sorts the band hashes of the articles with entities, per band
         """
-        returns a list of indices that correspond to similar articles
+        idx = np.flatnonzero(np.frombuffer(self.empty, dtype=np.int8) == 0)
+        hashes = self.band_hashes(self.sigs[idx])
+        self.bands = []
+        for b in range(self.BANDS):
+            order = np.argsort(hashes[:, b], kind='stable')
+            self.bands.append((hashes[order, b], idx[order]))
+
+    def candidates(self, idx):
+        hashes = self.band_hashes(self.sigs[idx:idx + 1])[0]
+        found = []
+        for b, (band, owners) in enumerate(self.bands):
+            lo = np.searchsorted(band, hashes[b], 'left')
+            hi = np.searchsorted(band, hashes[b], 'right')
+            found.append(owners[lo:hi])
+        found = np.unique(np.concatenate(found))
+        return found[found != idx]
+
+    def jaccard(self, i, j):
+        return (self.sigs[i] == self.sigs[j]).mean()
+
+    def query_similar(self, idx, nmax=3):
+        """
+        returns a list of articles similar to the article at `idx`
         The following conditions are maintained:
         * the retuned list does not contain the original article
         * No two articles in the list have the same title
         * For any two articles x, y in the list, the similarity is within (0.5, 0.8)
         """
-        title_set = set(art['title'])
-        minhash = self.compute_hash(art)
-        indices = self.lsh.query(minhash)
+        if self.bands is None:
+            self.build_bands()
+        if self.empty[idx]:
+            return []
+        title_set = set([self[idx]['title']])
         results = []
 
-        for midx in indices:
+        for midx in self.candidates(idx):
             if len(results) >= nmax:
                 break
-            # make sure title does not repeat
-            if art['title'] in title_set:
-                continue
 
             # make sure the article is not too similar to any other article
             # in fresutls
             is_similar = False
-            if minhash.jaccard(self.minhashes[midx]) > 0.8:
+            if self.jaccard(idx, midx) > 0.8:
                 is_similar = True
             for art_idx in results:
-                if self.minhashes[art_idx].jaccard(self.minhashes[midx]) > 0.8:
+                if self.jaccard(art_idx, midx) > 0.8:
                     is_similar = True
             if is_similar:
                 continue
 
+            # make sure title does not repeat
+            title = self[midx]['title']
+            if title in title_set:
+                continue
+            title_set.add(title)
+
             results.append(midx)
 
-        matched_arts = map(lambda i: self.articles[i], results)
+        matched_arts = map(lambda i: self[i], results)
         matched_arts = list(matched_arts)
         return matched_arts
 
 
 class HeadlinesProcessor:
 
-    def __init__(self, lang, input_path, output_path):
+    def __init__(self, lang, input_path, output_path, entities_path=None):
+        """
+        Entities are looked up in Wikidata, or in the local file of
+        entities at `entities_path` if given. The lookups are cached in
+        the output directory, across runs
+        """
         self.lang = lang
         self.script = code2script(lang)
         self.output_path = output_path
         self.input_corpus = NewsCorpus(lang, input_path)
-        self.artdb = ArticlesDatabase(self.lang)
+        backend = entities_path and DictionaryBackend(entities_path)
+        os.makedirs(output_path, exist_ok=True)
+        cache_path = os.path.join(output_path, '{}-words.db'.format(lang))
+        self.artdb = ArticlesDatabase(self.lang, backend, cache_path=cache_path)
 
     def _strip_txt(self, txt):
         txt = txt.strip()
@@ -248,9 +351,7 @@ class HeadlinesProcessor:
 
 
     def gen_dataset(self):
-        for fpath, payload in tqdm(self.input_corpus.instances()):
-            art = json.loads(payload)
-
+        for art in tqdm(self.input_corpus.all_instances()):
             if not art['title']:
                 continue
 
@@ -259,13 +360,13 @@ class HeadlinesProcessor:
             if len(art['title']) > 20 and len(art['body']) in range(200, 2000):
                 self.artdb.add(art)
 
-            if len(self.artdb) == 200000:
-                break
+        self.artdb.wikient.cache.flush()
 
         instances = []
+        generated = 0
 
-        for art in self.artdb:
-            similar = self.artdb.query_similar(art)
+        for idx, art in enumerate(self.artdb):
+            similar = self.artdb.query_similar(idx)
 
             if len(similar) < 3:
                 continue
@@ -283,14 +384,20 @@ class HeadlinesProcessor:
                 'optionC': cand_titles[2],
                 'optionD': cand_titles[3]
             }
-            instances.append(instance)
-
-            n = len(instances)
-            if n % 100 == 0:
-                print('Generated {} instances'.format(n))
+            # keep a uniform sample of 100k instances (reservoir sampling),
+            # now that the whole corpus is used
+            generated += 1
+            if len(instances) < 100000:
+                instances.append(instance)
+            else:
+                pos = random.randrange(generated)
+                if pos < 100000:
+                    instances[pos] = instance
+
+            if generated % 100 == 0:
+                print('Generated {} instances'.format(generated))
 
         random.shuffle(instances)
-        instances = instances[:100000]
         n = len(instances)
         s1, s2 = int(0.8*n), int(0.9*n)
         train = instances[:s1]
@@ -324,6 +431,7 @@ class HeadlinesProcessor:
 
 
 lang = sys.argv[1]
+entities_path = sys.argv[2] if len(sys.argv) > 2 else None
 print('Processing lang: ', lang)
-p = HeadlinesProcessor(lang, '/Users/divkakwani/Projects/webcorpus/artdir', '/Users/divkakwani/Projects/webcorpus/gendir')
+p = HeadlinesProcessor(lang, '/Users/divkakwani/Projects/webcorpus/artdir', '/Users/divkakwani/Projects/webcorpus/gendir', entities_path)
 p.gen_dataset()
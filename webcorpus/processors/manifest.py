@@ -0,0 +1,153 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Checkpoint manifest of a processing run
+
+A manifest records the input instances that a processor has already turned
+into output, so that a rerun over the same input and output, either after a
+crash or after the spiders add pages, only processes the new or changed
+instances. An instance is identified by the hash of its url and versioned by
+its crawl timestamp, so recrawled pages are processed again.
+
+"""
+import os
+import sqlite3
+
+from hashlib import sha1
+from ..corpus import url_hash
+
+
+def instance_key(instance):
+    """
+    Returns the (key, version) pair of an input instance
+    """
+    version = instance.get('timestamp') or instance.get('crawl_date') or ''
+    return url_hash(instance['url']), version
+
+
+class Manifest:
+    """
+    The instances marked `done` are recorded on disk only by `commit`, which
+    must be called after the output of those instances has been flushed. A
+    crash thus loses at most the work done since the last commit, never the
+    output of an instance that the manifest claims is done.
+
+    Processors that append to a single output file, or to a `ShardCorpus`,
+    also record the size of the file, or of the block index, on every
+    commit. Anything beyond that size was written after the last commit and
+    is cut off by `truncate` on the next run, unless a run over another
+    input has appended to the same output since.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = []
+        self.skipped = 0
+        # the inputs are filtered by `todo` in the feeder thread of a pool
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS done (key TEXT PRIMARY '
+                          'KEY, version TEXT) WITHOUT ROWID')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY '
+                          'KEY, value)')
+
+    @classmethod
+    def for_run(cls, name, input_path, output_path, output_dir=True):
+        """
+        Opens the manifest of processor `name` turning `input_path` into
+        `output_path`. It is kept inside the output if the output is a
+        directory, so that deleting the output also starts the processing
+        over, or else next to the output file.
+        """
+        input_id = sha1(os.path.abspath(input_path).encode('utf-8'))
+        fname = '.manifest-{}-{}.db'.format(name, input_id.hexdigest()[:10])
+        output_path = output_path.rstrip(os.sep)
+        if output_dir:
+            os.makedirs(output_path, exist_ok=True)
+            return cls(os.path.join(output_path, fname))
+        dirname, basename = os.path.split(output_path)
+        return cls(os.path.join(dirname, '.{}{}'.format(basename, fname)))
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM done').fetchone()[0]
+
+    def is_done(self, key, version):
+        row = self.conn.execute('SELECT version FROM done WHERE key = ?',
+                                (key,)).fetchone()
+        return row is not None and row[0] == version
+
+    def done(self, key, version):
+        self.pending.append((key, version))
+
+    def todo(self, instances):
+        """
+        Yields the instances that are not done yet, and counts the others
+        in `skipped`
+        """
+        for instance in instances:
+            if self.is_done(*instance_key(instance)):
+                self.skipped += 1
+                continue
+            yield instance
+
+    @property
+    def output_size(self):
+        row = self.conn.execute('SELECT value FROM meta WHERE name = ?',
+                                ('output_size',)).fetchone()
+        return row and row[0]
+
+    def commit(self, output_size=None):
+        self.conn.executemany('INSERT OR REPLACE INTO done (key, version) '
+                              'VALUES (?, ?)', self.pending)
+        if output_size is not None:
+            self.conn.execute('INSERT OR REPLACE INTO meta (name, value) '
+                              'VALUES (?, ?)', ('output_size', output_size))
+        self.conn.commit()
+        self.pending = []
+
+    def reset(self):
+        self.conn.execute('DELETE FROM done')
+        self.conn.execute('DELETE FROM meta')
+        self.conn.commit()
+        self.pending = []
+
+    def truncate(self, output_path, cut=None):
+        """
+        Cuts `output_path` back to its size at the last commit, and marks
+        the output as being written by this manifest's run. If the file is
+        shorter than that, it is not the output the manifest describes,
+        and the manifest is reset instead. A new manifest records the size
+        the file already has, so that earlier output is left alone.
+
+        The output is only cut if this manifest's run was the last to write
+        to it. If a run over another input has appended to it since, the
+        end of the output is that run's, and it is kept; the size recorded
+        is moved up to the current one instead.
+
+        If the file is only a part of the output, e.g. the block index of a
+        `ShardCorpus`, `cut(size)` is called to cut the whole output back.
+        """
+        size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+        committed = self.output_size
+        writer_path = _writer_path(output_path)
+        writer = None
+        if os.path.isfile(writer_path):
+            with open(writer_path, encoding='utf-8') as fp:
+                writer = fp.read()
+        if committed is None or size < committed:
+            self.reset()
+            self.commit(output_size=size)
+        elif size > committed and writer != os.path.abspath(self.path):
+            self.commit(output_size=size)
+        elif size > committed and cut is not None:
+            cut(committed)
+        elif size > committed:
+            with open(output_path, 'r+b') as fp:
+                fp.truncate(committed)
+        with open(writer_path, 'w', encoding='utf-8') as fp:
+            fp.write(os.path.abspath(self.path))
+
+
+def _writer_path(output_path):
+    # the manifest of the run that last wrote to an output
+    dirname, basename = os.path.split(output_path)
+    return os.path.join(dirname, '.{}.writer'.format(basename))
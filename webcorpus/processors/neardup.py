@@ -0,0 +1,267 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Remove near duplicate articles, e.g. the copies of a syndicated story
+
+"""
+import os
+import zlib
+import numpy as np
+
+from collections import Counter
+from tqdm import tqdm
+from ..corpus import get_news_corpus, url_hash
+
+
+# a band hash and the article it belongs to, as written to the bucket files
+RECORD = np.dtype([('hash', '<u8'), ('doc', '<u4')])
+# the url hash and body length of an article, in the order of the input
+DOC = np.dtype([('url', '<u8'), ('length', '<u4')])
+
+
+def url_key(url):
+    return int(url_hash(url)[:16], 16)
+
+
+def shingles(text, size):
+    """
+    crc32 hashes of the word `size`-grams of the text, which has a single
+    one if it is shorter than `size` words, and none if it has no words
+    """
+    words = text.split()
+    if not words:
+        return []
+    grams = (' '.join(words[i:i + size])
+             for i in range(max(len(words) - size + 1, 1)))
+    return [zlib.crc32(gram.encode('utf-8')) for gram in grams]
+
+
+class MinHasher:
+    """
+    MinHash signatures of shingle sets, computed for many sets at once
+
+    The permutations are multiply-shift hash functions of 32-bit values,
+    ((a * x + b) mod 2^64) >> 32, which numpy evaluates on uint64 arrays
+    without overflow checks.
+    """
+
+    def __init__(self, num_perm=128, seed=1, perm_chunk=8):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, 1 << 62, num_perm, dtype=np.uint64) | 1
+        self.b = rng.randint(0, 1 << 62, num_perm, dtype=np.uint64)
+        self.perm_chunk = perm_chunk
+
+    def signatures(self, shingle_sets):
+        """
+        Returns a (len(shingle_sets), num_perm) uint32 array. The sets must
+        not be empty
+        """
+        lens = np.fromiter(map(len, shingle_sets), dtype=np.int64,
+                           count=len(shingle_sets))
+        x = np.fromiter((h for s in shingle_sets for h in s), dtype=np.uint64,
+                        count=int(lens.sum()))
+        starts = np.cumsum(lens) - lens
+        sigs = np.empty((len(shingle_sets), self.num_perm), dtype=np.uint32)
+        shift = np.uint64(32)
+        for i in range(0, self.num_perm, self.perm_chunk):
+            a = self.a[i:i + self.perm_chunk, None]
+            b = self.b[i:i + self.perm_chunk, None]
+            hashed = (a * x[None, :] + b) >> shift
+            sigs[:, i:i + self.perm_chunk] = \
+                np.minimum.reduceat(hashed, starts, axis=1).T
+        return sigs
+
+
+class NearDupProcessor:
+    """
+    Writes one canonical article, the longest, of every cluster of near
+    duplicate articles in the input corpus to the output corpus
+
+    Articles are near duplicates if the Jaccard similarity of their sets of
+    word `shingle_size`-grams is above about `threshold`. It is estimated
+    by MinHash signatures of `num_perm` values, and candidate pairs are
+    found by banded LSH: the signatures are cut into `bands` bands, and
+    articles sharing a band are candidates. Candidates whose signatures
+    agree on at least `threshold` of the values are clustered. Articles with
+    no words are left out of the LSH, and are all kept.
+
+    The LSH index lives on disk, in `index_dir`, so the memory needed is a
+    few bytes per article plus one of `buckets` partitions of the index:
+    1. Signatures are computed in batches, written to a signature file, and
+       the band hashes are spread over bucket files
+    2. Every bucket is sorted, articles with equal band hashes are checked
+       against the signature file and merged into clusters (union-find)
+    3. The input corpus is read again and the canonical articles written
+    The index is rebuilt by every run and removed at the end of it.
+    """
+
+    def __init__(self, lang, input_path, output_path, backend=None,
+                 num_perm=128, bands=16, threshold=0.7, shingle_size=5,
+                 buckets=64, batch_size=500, index_dir=None):
+        assert num_perm % bands == 0
+        self.lang = lang
+        self.input_corpus = get_news_corpus(lang, input_path)
+        self.output_corpus = get_news_corpus(lang, output_path, backend)
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.buckets = buckets
+        self.batch_size = batch_size
+        self.index_dir = index_dir or output_path.rstrip(os.sep) + '.lsh'
+        rng = np.random.RandomState(2)
+        self.band_mult = rng.randint(1, 1 << 62, (bands, self.rows),
+                                     dtype=np.uint64) | 1
+
+    def index_path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def band_hashes(self, sigs):
+        """
+        Returns a (len(sigs), bands) uint64 array of hashes of the bands
+        """
+        bands = sigs.reshape(len(sigs), self.bands, self.rows).astype(np.uint64)
+        # wraps around on overflow, as intended
+        return (bands * self.band_mult[None, :, :]).sum(axis=2,
+                                                        dtype=np.uint64)
+
+    def index_batch(self, batch, first_doc, sig_fp, bucket_fps):
+        # the articles without shingles get a blank signature and no band
+        # hashes, so they are never candidates
+        hashed = np.flatnonzero(np.fromiter(map(len, batch), dtype=np.int64,
+                                            count=len(batch)))
+        sigs = np.zeros((len(batch), self.hasher.num_perm), dtype=np.uint32)
+        if len(hashed):
+            sigs[hashed] = self.hasher.signatures([batch[i] for i in hashed])
+        sigs.tofile(sig_fp)
+        hashes = self.band_hashes(sigs[hashed])
+        records = np.empty(hashes.shape, dtype=RECORD)
+        records['hash'] = hashes
+        records['doc'] = (first_doc + hashed)[:, None]
+        records = records.ravel()
+        bucket = records['hash'] % self.buckets
+        order = np.argsort(bucket, kind='stable')
+        records = records[order]
+        bounds = np.searchsorted(bucket[order], np.arange(self.buckets + 1))
+        for b in range(self.buckets):
+            records[bounds[b]:bounds[b + 1]].tofile(bucket_fps[b])
+
+    def build_index(self):
+        """
+        Writes the signatures, band hashes and article table of the input
+        corpus to `index_dir`, and returns the number of articles
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        bucket_fps = [open(self.index_path('bucket{}'.format(b)), 'wb')
+                      for b in range(self.buckets)]
+        sig_fp = open(self.index_path('signatures'), 'wb')
+        doc_fp = open(self.index_path('docs'), 'wb')
+
+        ndocs = 0
+        batch, docs = [], []
+        for art in tqdm(self.input_corpus.all_instances(), desc='hashing'):
+            body = art.get('body', '')
+            batch.append(shingles(body, self.shingle_size))
+            docs.append((url_key(art['url']), len(body)))
+            if len(batch) == self.batch_size:
+                self.index_batch(batch, ndocs, sig_fp, bucket_fps)
+                np.array(docs, dtype=DOC).tofile(doc_fp)
+                ndocs += len(batch)
+                batch, docs = [], []
+        if batch:
+            self.index_batch(batch, ndocs, sig_fp, bucket_fps)
+            np.array(docs, dtype=DOC).tofile(doc_fp)
+            ndocs += len(batch)
+
+        for fp in bucket_fps + [sig_fp, doc_fp]:
+            fp.close()
+        return ndocs
+
+    def remove_index(self):
+        names = ['signatures', 'docs'] + ['bucket{}'.format(b)
+                                          for b in range(self.buckets)]
+        for name in names:
+            if os.path.exists(self.index_path(name)):
+                os.remove(self.index_path(name))
+        try:
+            os.rmdir(self.index_dir)
+        except OSError:
+            # not empty: the directory was given and holds other files
+            pass
+
+    def cluster(self, ndocs):
+        """
+        Returns the cluster id of every article
+        """
+        sigs = np.memmap(self.index_path('signatures'), dtype=np.uint32,
+                         mode='r', shape=(ndocs, self.hasher.num_perm))
+        parent = np.arange(ndocs, dtype=np.uint32)
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for b in tqdm(range(self.buckets), desc='clustering'):
+            records = np.fromfile(self.index_path('bucket{}'.format(b)),
+                                  dtype=RECORD)
+            records = records[np.argsort(records['hash'], kind='stable')]
+            hashes = records['hash']
+            starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+            ends = np.r_[starts[1:], len(records)]
+            multi = ends - starts > 1
+            for start, end in zip(starts[multi], ends[multi]):
+                docs = np.unique(records['doc'][start:end])
+                if len(docs) < 2:
+                    continue
+                # LSH only proposes candidates; keep the ones whose
+                # signatures really are similar to the first one
+                agree = (sigs[docs[1:]] == sigs[docs[0]]).mean(axis=1)
+                root = find(docs[0])
+                for doc in docs[1:][agree >= self.threshold]:
+                    parent[find(doc)] = root
+
+        # point every article straight at the root of its cluster
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                return parent
+            parent = grandparent
+
+    def canonical_urls(self, clusters):
+        """
+        Returns the sorted url keys of the longest article of every cluster
+        """
+        docs = np.fromfile(self.index_path('docs'), dtype=DOC)
+        order = np.lexsort((-docs['length'].astype(np.int64), clusters))
+        first = np.r_[True, clusters[order][1:] != clusters[order][:-1]]
+        return np.sort(docs['url'][order[first]])
+
+    def run(self):
+        """
+        Returns the number of articles read and written
+        """
+        try:
+            ndocs = self.build_index()
+            if ndocs == 0:
+                return Counter()
+            canonical = self.canonical_urls(self.cluster(ndocs))
+        finally:
+            self.remove_index()
+
+        counts = Counter()
+        for art in tqdm(self.input_corpus.all_instances(), total=ndocs,
+                        desc='writing'):
+            key = np.uint64(url_key(art['url']))
+            pos = np.searchsorted(canonical, key)
+            counts['read'] += 1
+            if pos < len(canonical) and canonical[pos] == key:
+                self.output_corpus.add_instance(art)
+                counts['written'] += 1
+        self.output_corpus.flush()
+        print('Kept {} of {} articles'.format(counts['written'],
+                                              counts['read']))
+        return counts
@@ -0,0 +1,72 @@
+"""
+Copyright © Divyanshu Kakwani 2021, all rights reserved.
+
+Process pool shared by the processors that work page by page
+
+"""
+import multiprocessing as mp
+import threading
+
+
+# state of a pool worker, set up once by `_init_worker`
+_worker = {}
+
+
+def _init_worker(proc):
+    _worker['proc'] = proc
+    if hasattr(proc, 'init_worker'):
+        proc.init_worker()
+
+
+def _process_batch(batch):
+    return [_worker['proc'].process_item(item) for item in batch]
+
+
+def _process_keyed_batch(batch):
+    return [(key, _worker['proc'].process_item(item)) for key, item in batch]
+
+
+def _batches(items, batch_size, slots):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            slots.acquire()
+            yield batch
+            batch = []
+    if batch:
+        slots.acquire()
+        yield batch
+
+
+def imap_items(proc, items, workers=None, batch_size=32, max_pending=None,
+               key=None):
+    """
+    Calls `proc.process_item` on every item in a pool of processes and
+    yields the results as they are ready, in no particular order.
+
+    `proc` is sent to every worker once, when the worker starts, and may
+    define `init_worker` to set up per-worker state. Items are sent to the
+    workers in batches of `batch_size`. At most `max_pending` batches are
+    in flight at a time, so a slow consumer of the results holds back the
+    reading of `items` instead of letting it pile up in memory.
+
+    If a `key` function is given, it is applied to every item in this
+    process and the results are yielded as pairs (key, result), which tie
+    the unordered results back to their items.
+    """
+    workers = workers or mp.cpu_count()
+    slots = threading.BoundedSemaphore(max_pending or 4 * workers)
+    process_batch = _process_batch
+    if key is not None:
+        items = ((key(item), item) for item in items)
+        process_batch = _process_keyed_batch
+    proc_pool = mp.Pool(workers, _init_worker, (proc,))
+    try:
+        for results in proc_pool.imap_unordered(
+                process_batch, _batches(items, batch_size, slots)):
+            slots.release()
+            yield from results
+    finally:
+        proc_pool.terminate()
+        proc_pool.join()
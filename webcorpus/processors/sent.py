@@ -4,31 +4,109 @@ Copyright © Divyanshu Kakwani 2019, all rights reserved.
 Create a sentence file from an article corpus
 
 """
+import glob
 import json
+import os
 import sys
 import nltk
+import multiprocessing as mp
+import threading
 
-from nltk.tokenize import sent_tokenize, word_tokenize
+from itertools import islice
+from nltk.tokenize import word_tokenize
 from tqdm import tqdm
-from ..corpus import NewsCorpus, FileCorpus
+from ..corpus import get_news_corpus, FileCorpus
 from ..language.normalize import IndicNormalizerFactory
-from ..language.tokenize import trivial_tokenize
-from ..language.sentence_tokenize import sentence_split
-from ..language import code2script, in_script
+from ..language.tokenize import tokenize
+from ..language.segment import segment_batch
+from ..language import code2script
+from .manifest import Manifest, instance_key
 
 
 # nltk.download('punkt')
 
 
+# state of a pool worker, set up once by `_init_worker`
+_worker = {}
+
+
+def _init_worker(proc, output_path):
+    _worker['proc'] = proc
+    _worker['prefix'] = '{}.part{}'.format(output_path, os.getpid())
+    _worker['parts'] = 0
+    _open_part()
+    mp.util.Finalize(None, _close_part, exitpriority=10)
+
+
+def _open_part():
+    _worker['shard'] = '{}.{}'.format(_worker['prefix'], _worker['parts'])
+    _worker['fp'] = open(_worker['shard'], 'wb')
+    _worker['parts'] += 1
+
+
+def _close_part():
+    _worker['fp'].close()
+
+
+def _process_batch(batch):
+    """
+    Writes the sentences of a batch of article bodies to the worker's shard
+    and returns where they were written. The worker moves on to a new shard
+    once its shard has grown past `part_size`, so that the merged shards
+    can be removed
+    """
+    seq, contents = batch
+    segmented = segment_batch(contents, _worker['proc'].lang)
+    data = ''.join(sent + '\n' for sents in segmented
+                   for sent in sents).encode('utf-8')
+    if _worker['fp'].tell() >= _worker['proc'].part_size:
+        _close_part()
+        _open_part()
+    fp = _worker['fp']
+    offset = fp.tell()
+    fp.write(data)
+    fp.flush()
+    return seq, _worker['shard'], offset, len(data), len(contents)
+
+
 class SentProcessor:
 
-    def __init__(self, lang, input_path, output_path):
+    def __init__(self, lang, input_path, output_path, workers=1,
+                 chunk_size=64, ordered=True, max_pending=None,
+                 part_size=64 << 20):
+        """
+        With more than one worker, batches of `chunk_size` articles are
+        processed by a pool of processes, each of which writes to its own
+        shard file. The shards are merged into the output at every
+        checkpoint, in the input order if `ordered` is set, or else in the
+        order in which the batches complete. At most `max_pending` batches
+        are in flight at a time (four per worker by default). The shards
+        are rolled over at `part_size` bytes and removed once merged.
+        """
         self.lang = lang
         self.script = code2script(lang)
-        self.input_corpus = NewsCorpus(lang, input_path)
+        self.output_path = output_path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.ordered = ordered
+        self.max_pending = max_pending or 4 * workers
+        self.part_size = part_size
+        self.input_corpus = get_news_corpus(lang, input_path)
         self.output_corpus = FileCorpus(lang, output_path)
+        self.manifest = Manifest.for_run('sents', input_path, output_path,
+                                         output_dir=False)
+        self.checkpoint_every = 1000
+        self.batch_keys = {}
         normalizer_factory = IndicNormalizerFactory()
-        self.normalizer = normalizer_factory.get_normalizer(self.lang)
+        self.normalizer = normalizer_factory.get_normalizer(self.lang, compiled=True)
+
+    def __getstate__(self):
+        # the pool workers write to their own shards
+        state = self.__dict__.copy()
+        del state['input_corpus']
+        del state['output_corpus']
+        del state['manifest']
+        return state
 
     def process_sent(self, sent):
         """
@@ -46,37 +124,110 @@ class SentProcessor:
         # num_masked = re.sub(r'[0-9]+', '#', normalized)
         # native_digits = SCRIPT_DIGITS[self.script]
         # num_masked = re.sub(r'[{}]+'.format(native_digits), '#', num_masked)
-        spaced = ' '.join(trivial_tokenize(normalized, self.lang))
+        spaced = tokenize(normalized, self.lang)
         """
         return newline_removed
 
-    def check_sent(self, sent):
+    def batches(self, slots=None):
         """
-        * Check sentences that contain one or more words not in the
-          desired language
-        * Check short sentences
+        Yields the batches of articles to process as pairs (seq, bodies). A
+        slot is taken from `slots`, if given, for every batch
         """
-        if len(sent) < 10:
-            return False
-        cval = map(lambda c: in_script(c, self.script) or c.isdigit(), sent)
-        if sum(cval) >= 0.9*len(sent):
-            return True
-        return False
+        articles = self.manifest.todo(self.input_corpus.all_instances())
+        seq = 0
+        while True:
+            batch = list(islice(articles, self.chunk_size))
+            if not batch:
+                break
+            self.batch_keys[seq] = [instance_key(art) for art in batch]
+            if slots is not None:
+                slots.acquire()
+            yield seq, [article['body'] for article in batch]
+            seq += 1
 
-    def run(self):
-        for article in tqdm(self.input_corpus.all_instances()):
-            # article = json.loads(payload)
-            content = article['body']
-            content = content.replace(u'\xa0', u' ')
-            content = content.replace('\\n', '\n')
-            sents = []
-            if self.lang == 'en':
-                sents = sent_tokenize(content)
-            else:
-                for para in content.split('\n'):
-                    sents += sentence_split(para, self.lang)
-            # sents = [self.process_sent(sent) for sent in sents]
-            sents = [sent for sent in sents if self.check_sent(sent)]
-            for sent in sents:
-                self.output_corpus.add_instance(sent)
+    def checkpoint(self):
+        """
+        Records the articles done so far, once their sentences are in the
+        output file
+        """
+        self.output_corpus.flush()
+        self.manifest.commit(os.path.getsize(self.output_path))
+
+    def merge(self, parts, retired=()):
+        """
+        Appends the sentences written by the workers to the output file, in
+        the order of `parts`, and checkpoints. The `retired` shards, which
+        the workers no longer write to, are removed afterwards
+        """
         self.output_corpus.flush()
+        shards = set(shard for _, shard, _, _ in parts)
+        fps = {shard: open(shard, 'rb') for shard in shards}
+        with open(self.output_path, 'ab') as out:
+            for _, shard, offset, length in parts:
+                fps[shard].seek(offset)
+                out.write(fps[shard].read(length))
+        for fp in fps.values():
+            fp.close()
+        self.checkpoint()
+        for shard in retired:
+            os.remove(shard)
+
+    def remove_shards(self):
+        # workers that got no batch leave an empty shard behind, and a
+        # crashed run leaves all of its shards
+        for shard in glob.glob(glob.escape(self.output_path) + '.part*'):
+            os.remove(shard)
+
+    def run_parallel(self):
+        self.remove_shards()
+        proc_pool = mp.Pool(self.workers, _init_worker,
+                            (self, self.output_path))
+        imap = proc_pool.imap if self.ordered else proc_pool.imap_unordered
+        # the pool reads the batches in a thread of its own, as fast as it
+        # can, unless held back until the results come in
+        slots = threading.BoundedSemaphore(self.max_pending)
+        parts = []
+        # the shard each worker writes to; the results of a worker come in
+        # the order it wrote them, so once a worker is seen writing to a new
+        # shard, its previous one is complete
+        current, retired = {}, []
+        with tqdm() as pbar:
+            for seq, shard, offset, length, narts in \
+                    imap(_process_batch, self.batches(slots)):
+                slots.release()
+                prefix = shard.rsplit('.', 1)[0]
+                if current.get(prefix, shard) != shard:
+                    retired.append(current[prefix])
+                current[prefix] = shard
+                parts.append((seq, shard, offset, length))
+                for key, version in self.batch_keys.pop(seq):
+                    self.manifest.done(key, version)
+                if len(self.manifest.pending) >= self.checkpoint_every:
+                    self.merge(parts, retired)
+                    parts, retired = [], []
+                pbar.update(narts)
+        proc_pool.close()
+        proc_pool.join()
+        self.merge(parts, retired)
+        self.remove_shards()
+
+    def run(self):
+        """
+        Appends the sentences of the articles that are not done yet to the
+        output. Output written after the last checkpoint of a crashed run
+        is cut off first, as those articles are processed again.
+        """
+        self.manifest.truncate(self.output_path)
+        if self.workers > 1:
+            return self.run_parallel()
+        with tqdm() as pbar:
+            for seq, contents in self.batches():
+                for sents in segment_batch(contents, self.lang):
+                    for sent in sents:
+                        self.output_corpus.add_instance(sent)
+                for key, version in self.batch_keys.pop(seq):
+                    self.manifest.done(key, version)
+                if len(self.manifest.pending) >= self.checkpoint_every:
+                    self.checkpoint()
+                pbar.update(len(contents))
+        self.checkpoint()
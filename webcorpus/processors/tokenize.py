@@ -12,7 +12,7 @@ from nltk.tokenize import sent_tokenize, word_tokenize
 from tqdm import tqdm
 from ..corpus import NewsCorpus, FileCorpus
 from ..language.normalize import IndicNormalizerFactory
-from ..language.tokenize import trivial_tokenize
+from ..language.tokenize import tokenize
 from ..language.sentence_tokenize import sentence_split
 from ..language import code2script, in_script
 
@@ -28,7 +28,7 @@ class Tokenizer:
         self.input_corpus = FileCorpus(lang, input_path)
         self.output_corpus = FileCorpus(lang, output_path)
         normalizer_factory = IndicNormalizerFactory()
-        self.normalizer = normalizer_factory.get_normalizer(self.lang)
+        self.normalizer = normalizer_factory.get_normalizer(self.lang, compiled=True)
 
     def process_sent(self, sent):
         processed_sent = sent.replace('\n', ' ')
@@ -37,7 +37,7 @@ class Tokenizer:
             return ' '.join(word_tokenize(processed_sent))
 
         processed_sent = self.normalizer.normalize(processed_sent)
-        processed_sent = ' '.join(trivial_tokenize(processed_sent, self.lang))
+        processed_sent = tokenize(processed_sent, self.lang)
 
         return processed_sent
 
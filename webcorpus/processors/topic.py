@@ -7,7 +7,7 @@ Creates text classification dataset from a news article corpus
 import json
 
 from tqdm import tqdm
-from ..corpus import NewsCorpus, FileCorpus
+from ..corpus import get_news_corpus, FileCorpus
 
 
 topic_synsets = {
@@ -33,7 +33,7 @@ class TopicProcessor:
 
     def __init__(self, lang, input_path, output_path):
         self.lang = lang
-        self.input_corpus = NewsCorpus(lang, input_path)
+        self.input_corpus = get_news_corpus(lang, input_path)
         self.output_corpus = FileCorpus(lang, output_path, encoding='csv')
 
     def run(self):